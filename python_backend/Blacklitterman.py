@@ -1,32 +1,44 @@
 import yfinance as yf
 import numpy as np
 import pandas as pd
-import requests # Still needed for standalone test block
+from scipy.linalg import cho_factor, cho_solve
+import requests
+from requests.adapters import HTTPAdapter
 import os
-from dotenv import load_dotenv
-from langdetect import detect, DetectorFactory
-from langdetect.lang_detect_exception import LangDetectException
-from typing import Union, Dict, List
-import nltk
-from nltk.sentiment.vader import SentimentIntensityAnalyzer
+import time
+import logging
+import functools
+from typing import Union, Dict, List, Optional
+from concurrent.futures import ThreadPoolExecutor
 
-# Ensure NLTK vader_lexicon is downloaded
-try:
-    nltk.data.find('sentiment/vader_lexicon.zip')
-except LookupError: # Corrected to LookupError to trigger download if missing
-    nltk.download('vader_lexicon')
+from data_cache import download_prices, extract_close_prices, load_cached, save_cached, MARKET_CAP_CACHE_TTL
 
-# Set seed for langdetect for consistent results
-DetectorFactory.seed = 0
+log = logging.getLogger(__name__)
 
-# Load environment variables (for News API Key within this module if used standalone)
-load_dotenv()
-# NEWSAPI_API_KEY_FROM_ENV is now primarily for the standalone test block of blacklitterman.py
-NEWSAPI_API_KEY_FROM_ENV = os.getenv("NEWSAPI_API_KEY")
+# NLTK is only needed for sentiment scoring, so it is imported on first use rather than at module import.
+# That keeps callers that only need the Black-Litterman math (e.g. calculate_optimal_weights) fast to import.
 
-if not NEWSAPI_API_KEY_FROM_ENV:
-    # This warning is for when blacklitterman.py is run directly, not when imported by main.py
-    print("WARNING: NEWSAPI_API_KEY not found in .env. Sentiment views may be limited for standalone testing.")
+# Shared HTTP session so repeated calls reuse pooled keep-alive connections instead of a new TLS handshake each
+_HTTP_SESSION = requests.Session()
+_HTTP_SESSION.mount('https://', HTTPAdapter(pool_connections=10, pool_maxsize=10))
+
+
+@functools.lru_cache(maxsize=None)
+def _get_sentiment_analyzer():
+    """
+    Returns a shared VADER analyzer, importing NLTK and fetching the lexicon on the first call only.
+    """
+    import nltk
+    from nltk.sentiment.vader import SentimentIntensityAnalyzer
+
+    # Ensure NLTK vader_lexicon is downloaded
+    try:
+        nltk.data.find('sentiment/vader_lexicon.zip')
+    except LookupError: # Corrected to LookupError to trigger download if missing
+        nltk.download('vader_lexicon')
+
+    # Build the analyzer once; its constructor reads and parses the whole VADER lexicon file
+    return SentimentIntensityAnalyzer()
 
 
 # Removed fetch_news from here as it's now handled by main.py for integrated app
@@ -37,14 +49,115 @@ def analyze_sentiment_vader(headlines: List[str]) -> float:
     """
     Analyzes the sentiment of a list of headlines using VADER and returns the average compound score.
     """
-    sia = SentimentIntensityAnalyzer()
+    sia = _get_sentiment_analyzer()
     if not headlines:
         return 0.0 # Neutral sentiment if no headlines
 
-    scores = [sia.polarity_scores(title)['compound'] for title in headlines]
-    return np.mean(scores)
+    scores = np.fromiter((sia.polarity_scores(title)['compound'] for title in headlines),
+                         dtype=np.float64, count=len(headlines))
+    return scores.mean()
+
+def analyze_sentiment_by_symbol(symbols: List[str], headlines_dict: Dict[str, List[str]]) -> np.ndarray:
+    """
+    Batched analyze_sentiment_vader for many symbols: all headlines are scored in one flat pass,
+    then averaged back per symbol with np.bincount. Symbols with no headlines score 0.0 (neutral).
+
+    Returns:
+        (len(symbols),) array of mean compound scores, in `symbols` order.
+    """
+    flat_headlines = []
+    owner_index = []
+    for i, symbol in enumerate(symbols):
+        symbol_headlines = headlines_dict.get(symbol, [])
+        flat_headlines.extend(symbol_headlines)
+        owner_index.extend([i] * len(symbol_headlines))
+
+    if not flat_headlines:
+        return np.zeros(len(symbols))
+
+    sia = _get_sentiment_analyzer()
+    scores = np.fromiter((sia.polarity_scores(title)['compound'] for title in flat_headlines),
+                         dtype=np.float64, count=len(flat_headlines))
+    score_sums = np.bincount(owner_index, weights=scores, minlength=len(symbols))
+    counts = np.bincount(owner_index, minlength=len(symbols))
+    return np.divide(score_sums, counts, out=np.zeros(len(symbols)), where=counts > 0)
+
+# Yahoo's quote endpoint returns marketCap for up to 20 symbols in one small JSON response
+YAHOO_QUOTE_URL = "https://query1.finance.yahoo.com/v7/finance/quote"
+YAHOO_QUOTE_BATCH_SIZE = 20
+
+def _fetch_market_caps_batch(symbols: List[str]) -> Dict[str, int]:
+    """
+    Fetches market caps for many symbols with one request per 20 symbols.
+    Symbols missing from the response (or whose chunk failed) are simply absent from the result.
+    """
+    market_caps = {}
+    for start in range(0, len(symbols), YAHOO_QUOTE_BATCH_SIZE):
+        chunk = symbols[start:start + YAHOO_QUOTE_BATCH_SIZE]
+        try:
+            response = _HTTP_SESSION.get(
+                YAHOO_QUOTE_URL,
+                params={"symbols": ",".join(chunk)},
+                headers={"User-Agent": "Mozilla/5.0"},
+                timeout=5
+            )
+            response.raise_for_status()
+            for quote in response.json().get("quoteResponse", {}).get("result", []):
+                if quote.get("symbol") and quote.get("marketCap"):
+                    market_caps[quote["symbol"]] = quote["marketCap"]
+        except Exception as e:
+            log.warning("Batch market cap request failed for %s: %s", chunk, e)
+    return market_caps
+
+def _fetch_market_cap(symbol: str) -> Union[int, None]:
+    """
+    Fetches the market cap for a single symbol from yfinance. Returns None if unavailable.
+    """
+    try:
+        return yf.Ticker(symbol).info.get('marketCap')
+    except Exception as e:
+        log.warning("Error fetching market cap for %s: %s", symbol, e)
+        return None
+
+# In-process {symbol: (fetched_at, market cap)} memo so repeat calls within a run skip even the disk cache.
+# Failed lookups are never stored, so they are retried on the next call.
+_MARKET_CAP_MEMO: Dict[str, tuple] = {}
 
-def get_implied_equilibrium_returns_and_cov(symbols: List[str], period: str = "10y", risk_aversion: float = 2.5):
+def _get_market_caps(symbols: List[str]) -> Dict[str, Union[int, None]]:
+    """
+    Returns {symbol: market cap or None}, checking the in-process and disk caches first, then the batched
+    quote endpoint, and only falling back to per-ticker .info scrapes for what is still missing.
+    """
+    now = time.time()
+    market_caps = {}
+    for sym in symbols:
+        # In-process memo first (a dict lookup), then the on-disk cache
+        memo_entry = _MARKET_CAP_MEMO.get(sym)
+        if memo_entry and now - memo_entry[0] <= MARKET_CAP_CACHE_TTL:
+            market_caps[sym] = memo_entry[1]
+            continue
+        market_caps[sym] = load_cached(f"market_cap|{sym}", MARKET_CAP_CACHE_TTL)
+        if market_caps[sym] is not None:
+            _MARKET_CAP_MEMO[sym] = (now, market_caps[sym])
+
+    missing = [sym for sym in symbols if market_caps[sym] is None]
+    if missing:
+        market_caps.update(_fetch_market_caps_batch(missing))
+
+    still_missing = [sym for sym in symbols if market_caps[sym] is None]
+    if still_missing:
+        # Each .info lookup is a blocking HTTP round-trip, so issue them concurrently.
+        with ThreadPoolExecutor(max_workers=min(16, len(still_missing))) as executor:
+            market_caps.update(zip(still_missing, executor.map(_fetch_market_cap, still_missing)))
+
+    for sym in missing: # Only freshly fetched values need storing
+        if market_caps[sym]:
+            _MARKET_CAP_MEMO[sym] = (now, market_caps[sym])
+            save_cached(f"market_cap|{sym}", market_caps[sym])
+    return market_caps
+
+def get_implied_equilibrium_returns_and_cov(symbols: List[str], period: str = "10y", risk_aversion: float = 2.5,
+                                            dtype: type = np.float64, data=None):
     """
     Downloads historical data, calculates market-implied equilibrium returns (Pi)
     and the covariance matrix (Sigma) for a given set of symbols.
@@ -53,101 +166,90 @@ def get_implied_equilibrium_returns_and_cov(symbols: List[str], period: str = "1
         symbols: List of stock ticker symbols.
         period: Historical data period (e.g., "1y", "6mo").
         risk_aversion: Scalar risk aversion coefficient for calculating Pi.
+        dtype: Precision for the covariance GEMM. np.float32 halves memory traffic for small portfolios;
+               the result is always returned as float64 for the downstream solves.
+        data: Optional prefetched download_prices(symbols, period) result, so callers that also run
+              Monte Carlo on the same history can share one batched download.
 
     Returns:
         A tuple: (implied_returns_daily: np.ndarray, cov_matrix_daily: np.ndarray, final_symbols: List[str])
         final_symbols returns the list of symbols that actually had valid data.
     """
-    print(f"Downloading historical data for {symbols} over {period} using yfinance...")
-    
-    # Use group_by='ticker' for multi-symbol downloads to get MultiIndex columns
-    # auto_adjust=True uses Adjusted Close, which is generally preferred.
-    data = yf.download(symbols, period=period, group_by='ticker', auto_adjust=True)
+    if data is None:
+        log.info("Downloading historical data for %s over %s using yfinance...", symbols, period)
+        # Cached on disk per (symbols, period); see data_cache.download_prices
+        data = download_prices(symbols, period)
 
-    prices = pd.DataFrame()
-    successful_symbols = []
-    
-    # Robust extraction from MultiIndex DataFrame (or flat for single symbol)
-    for sym in symbols:
-        try:
-            if isinstance(data.columns, pd.MultiIndex): # Multi-symbol download
-                if (sym, 'Adj Close') in data.columns and not data[(sym, 'Adj Close')].empty:
-                    prices[sym] = data[(sym, 'Adj Close')]
-                elif (sym, 'Close') in data.columns and not data[(sym, 'Close')].empty: # Fallback to 'Close'
-                    prices[sym] = data[(sym, 'Close')]
-                else:
-                    raise KeyError(f"No valid 'Adj Close' or 'Close' data found for {sym} in MultiIndex.")
-            else: # Single symbol download (columns are not MultiIndex)
-                if 'Adj Close' in data.columns and not data['Adj Close'].empty:
-                    prices[sym] = data['Adj Close']
-                elif 'Close' in data.columns and not data['Close'].empty: # Fallback to 'Close'
-                    prices[sym] = data['Close']
-                else:
-                    raise KeyError(f"No valid 'Adj Close' or 'Close' data found for single symbol {sym}.")
-            
-            successful_symbols.append(sym)
-        except KeyError as e:
-            print(f"WARNING: Skipping '{sym}' due to missing or empty data: {e}")
-            # Do not re-raise, allow other symbols to be processed
+    prices, successful_symbols = extract_close_prices(data, symbols)
 
     if not successful_symbols:
         raise ValueError("No valid stock data found for any of the provided symbols.")
 
-    prices = prices[successful_symbols].dropna()
+    prices = prices[~np.isnan(prices).any(axis=1)] # Drop dates where any symbol is missing
     
-    if prices.empty or len(prices) < 2:
+    if prices.shape[0] < 2:
         raise ValueError(f"Not enough historical data for {successful_symbols} to calculate returns (need at least 2 data points after dropping NaNs).")
 
-    returns = np.log(prices / prices.shift(1)).dropna()
+    # Log returns on the raw array: log in place (the masked prices above are already our own copy),
+    # then difference into one preallocated buffer
+    log_prices = prices
+    np.log(log_prices, out=log_prices)
+    returns = np.empty((log_prices.shape[0] - 1, log_prices.shape[1]))
+    np.subtract(log_prices[1:], log_prices[:-1], out=returns)
+    returns = returns[np.isfinite(returns).all(axis=1)]
 
-    if returns.empty:
+    if returns.size == 0:
         raise ValueError(f"Not enough valid returns for {successful_symbols} to calculate covariance.")
     
-    returns = returns[successful_symbols] # Ensure returns DataFrame contains only successful symbols
-    
     final_symbols = successful_symbols 
     num_assets = len(final_symbols)
 
-    cov_matrix_daily = returns.cov()
+    # Sample covariance as a single GEMM on the centred returns (same result as DataFrame.cov()),
+    # symmetrized to remove floating-point asymmetry before Cholesky/inversion downstream.
+    returns_for_cov = returns.astype(dtype, copy=False)
+    centered_returns = returns_for_cov - returns_for_cov.mean(axis=0, keepdims=True)
+    cov_matrix_daily = (centered_returns.T @ centered_returns / (returns.shape[0] - 1)).astype(np.float64, copy=False)
+    cov_matrix_daily = 0.5 * (cov_matrix_daily + cov_matrix_daily.T)
 
     # DEBUG PRINT: Check the covariance matrix values
-    print("\n--- DEBUG COVARIANCE MATRIX ---")
-    print(f"Shape of cov_matrix_daily: {cov_matrix_daily.shape}")
-    print(f"Diagonal (variances) of cov_matrix_daily: {np.diag(cov_matrix_daily.values)}")
-    print(f"Sample cov_matrix_daily:\n{cov_matrix_daily.head()}") # Print first few rows/cols
+    log.debug("Shape of cov_matrix_daily: %s", cov_matrix_daily.shape)
+    log.debug("Diagonal (variances) of cov_matrix_daily: %s", np.diag(cov_matrix_daily))
+    log.debug("Sample cov_matrix_daily:\n%s", cov_matrix_daily[:5, :5]) # First few rows/cols
 
 
     # Estimate market cap weights for implied equilibrium returns (Pi)
     market_caps = []
     try:
+        market_caps_by_symbol = _get_market_caps(final_symbols)
+
         all_market_caps_found = True
         for sym in final_symbols: # Use the filtered symbols list
-            ticker_info = yf.Ticker(sym).info
-            market_cap = ticker_info.get('marketCap')
+            market_cap = market_caps_by_symbol.get(sym)
             if market_cap:
                 market_caps.append(market_cap)
             else:
-                print(f"Warning: Could not get market cap for {sym}. Using average historical return as approximation for Pi.")
+                log.warning("Could not get market cap for %s. Using average historical return as approximation for Pi.", sym)
                 all_market_caps_found = False
                 break
         
         if all_market_caps_found and market_caps: 
             market_cap_weights = np.array(market_caps) / np.sum(market_caps)
-            implied_returns_daily = risk_aversion * cov_matrix_daily.values @ market_cap_weights.reshape(-1, 1)
+            implied_returns_daily = risk_aversion * cov_matrix_daily @ market_cap_weights.reshape(-1, 1)
         else:
-            print("Using average historical returns as placeholder for implied equilibrium returns due to missing market caps.")
-            implied_returns_daily = np.full((num_assets, 1), returns.mean().mean())
+            log.warning("Using average historical returns as placeholder for implied equilibrium returns due to missing market caps.")
+            implied_returns_daily = np.full((num_assets, 1), returns.mean())
 
     except Exception as e:
-        print(f"Error fetching market caps for Pi calculation: {e}. Using average historical returns as placeholder.")
-        implied_returns_daily = np.full((num_assets, 1), returns.mean().mean())
+        log.error("Error fetching market caps for Pi calculation: %s. Using average historical returns as placeholder.", e)
+        implied_returns_daily = np.full((num_assets, 1), returns.mean())
 
-    return implied_returns_daily, cov_matrix_daily.values, final_symbols # RETURN `final_symbols`
+    return implied_returns_daily, cov_matrix_daily, final_symbols # RETURN `final_symbols`
 
 def get_sentiment_based_views(
     symbols: List[str],
     cov_matrix: np.ndarray,
-    headlines_dict: Dict[str, List[str]] # FIX: Added this parameter to accept pre-fetched headlines
+    headlines_dict: Optional[Dict[str, List[str]]] = None, # FIX: Added this parameter to accept pre-fetched headlines
+    precomputed_scores: Optional[np.ndarray] = None
 ) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
     """
     Generates Black-Litterman P, Q, and Omega matrices based on sentiment analysis.
@@ -157,70 +259,57 @@ def get_sentiment_based_views(
         symbols: List of stock ticker symbols.
         cov_matrix: The covariance matrix of asset returns.
         headlines_dict: Dictionary of {symbol: [list of headlines]} provided externally.
+        precomputed_scores: Optional (len(symbols),) array of mean sentiment per symbol
+                            (e.g. from analyze_sentiment_by_symbol); skips scoring headlines_dict.
     Returns:
         A tuple: (P_matrix: np.ndarray, Q_vector: np.ndarray, Omega_matrix: np.ndarray)
     """
     if not symbols:
         return np.empty((0, 0)), np.empty((0, 1)), np.empty((0, 0))
 
-    sentiment_results = {}
-    
-    # Use the provided headlines_dict directly instead of calling fetch_news() internally
-    for symbol in symbols:
-        headlines = headlines_dict.get(symbol, []) # Use headlines_dict here
-        sentiment_scores = analyze_sentiment_vader(headlines)
-        sentiment_results[symbol] = sentiment_scores
-        print(f"Sentiment for {symbol}: {sentiment_scores:.4f}")
-
-    ticker_index = {sym: i for i, sym in enumerate(symbols)}
-    P_list = []
-    Q_list = []
-    
+    # Use the provided headlines_dict directly instead of calling fetch_news() internally;
+    # every symbol's headlines are scored in one batch
+    if precomputed_scores is not None:
+        sentiments = np.asarray(precomputed_scores, dtype=np.float64).ravel()
+        if sentiments.shape[0] != len(symbols):
+            raise ValueError(f"precomputed_scores has {sentiments.shape[0]} entries for {len(symbols)} symbols.")
+    else:
+        sentiments = analyze_sentiment_by_symbol(symbols, headlines_dict or {})
+
     sentiment_diff_threshold = 0.10
     tau_for_omega_calc = 0.025
     sentiment_to_return_factor = 0.001
 
-    print(f"\n--- DEBUG VIEW GENERATION ---")
-    print(f"Symbols being processed for views: {symbols}")
-    print(f"Sentiment results: {sentiment_results}")
-    print(f"Sentiment diff threshold: {sentiment_diff_threshold}")
-    
-    if len(symbols) > 1:
-        base_stock_sym = symbols[0]
-        base_stock_sentiment = sentiment_results.get(base_stock_sym, 0.0)
-        print(f"Base stock for views: {base_stock_sym} (Sentiment: {base_stock_sentiment})")
-
-        for i in range(1, len(symbols)):
-            current_sym = symbols[i]
-            current_sentiment = sentiment_results.get(current_sym, 0.0)
-            sentiment_diff = current_sentiment - base_stock_sentiment
-
-            print(f"Comparing {current_sym} ({current_sentiment:.4f}) vs {base_stock_sym} ({base_stock_sentiment:.4f})")
-            print(f"Sentiment difference: {sentiment_diff:.4f} (abs: {abs(sentiment_diff):.4f})")
-
-            if abs(sentiment_diff) > sentiment_diff_threshold:
-                view_row = np.zeros(len(symbols))
-                view_row[ticker_index[current_sym]] = 1
-                view_row[ticker_index[base_stock_sym]] = -1
-                P_list.append(view_row)
-                
-                Q_list.append([sentiment_diff * sentiment_to_return_factor])
-                print(f"VIEW CREATED: {current_sym} vs {base_stock_sym}. P_row: {view_row}, Q_val: {Q_list[-1][0]:.4f}")
-            else:
-                print(f"NO VIEW CREATED: Difference {abs(sentiment_diff):.4f} <= threshold {sentiment_diff_threshold}")
-        
-    P_matrix = np.array(P_list) if P_list else np.empty((0, len(symbols)))
-    Q_vector = np.array(Q_list) if Q_list else np.empty((0, 1))
+    log.debug("Symbols being processed for views: %s", symbols)
+    log.debug("Sentiment results: %s", dict(zip(symbols, sentiments.tolist())))
+    log.debug("Sentiment diff threshold: %s", sentiment_diff_threshold)
 
-    print(f"P_list at end of function: {P_list}")
-    print(f"Q_list at end of function: {Q_list}")
-    print(f"Final P_matrix shape: {P_matrix.shape}")
+    # Every view is "symbol i vs the base stock (symbols[0])", so build all rows at once:
+    # +1 in the symbol's column, -1 in the base column, for each difference above the threshold.
+    sentiment_diffs = sentiments[1:] - sentiments[0]
+    view_mask = np.abs(sentiment_diffs) > sentiment_diff_threshold
 
-    if P_matrix.shape[0] > 0:
-        Omega_matrix = np.diag(np.diag(P_matrix @ (tau_for_omega_calc * cov_matrix) @ P_matrix.T))
-        Omega_matrix += np.eye(Omega_matrix.shape[0]) * 1e-9 # Add epsilon for numerical stability
-    else:
-        Omega_matrix = np.empty((0, 0)) # Empty if no views
+    # Common "no strong signal" case: skip building the view matrices entirely
+    if not view_mask.any():
+        log.debug("No sentiment difference exceeds the threshold; no views created.")
+        return np.empty((0, len(symbols))), np.empty((0, 1)), np.empty((0, 0))
+
+    view_columns = np.flatnonzero(view_mask) + 1 # +1 because diffs skip the base stock
+
+    num_views = len(view_columns)
+    P_matrix = np.zeros((num_views, len(symbols)))
+    P_matrix[np.arange(num_views), view_columns] = 1
+    P_matrix[:, 0] = -1
+    Q_vector = (sentiment_diffs[view_mask] * sentiment_to_return_factor).reshape(-1, 1)
+
+    if log.isEnabledFor(logging.DEBUG):
+        log.debug("Views created for: %s vs %s", [symbols[col] for col in view_columns], symbols[0])
+        log.debug("Q values: %s", Q_vector.ravel())
+        log.debug("Final P_matrix shape: %s", P_matrix.shape)
+
+    # Only the diagonal of P (tau*Sigma) P^T is kept, so contract row-by-row instead of forming the K x K product
+    P_tau_sigma = P_matrix @ (tau_for_omega_calc * cov_matrix)
+    Omega_matrix = np.diag(np.einsum('ij,ij->i', P_tau_sigma, P_matrix) + 1e-9) # Add epsilon for numerical stability
 
     return P_matrix, Q_vector, Omega_matrix
 
@@ -253,41 +342,42 @@ def calculate_posterior_returns(implied_eq_returns: np.ndarray,
         implied_eq_returns = implied_eq_returns.reshape(-1, 1)
 
     if P_matrix.shape[0] == 0:
-        print("No views defined. Posterior returns are equal to prior implied returns.")
+        log.info("No views defined. Posterior returns are equal to prior implied returns.")
         return implied_eq_returns
 
-    tau_sigma_inv = np.linalg.inv(tau * cov_matrix)
-
     if Omega_matrix.size == 0: # Check if Omega is empty (e.g., if no views were generated)
-        print("WARNING: Omega matrix is empty (no views). Treating as no views (should be covered by P_matrix.shape[0]==0).")
+        log.warning("Omega matrix is empty (no views). Treating as no views (should be covered by P_matrix.shape[0]==0).")
         return implied_eq_returns 
     
     if Omega_matrix.shape == (1, 1) and Omega_matrix[0,0] == 0: # Specific check for 1x1 zero Omega
-        print("WARNING: Omega matrix contains zero uncertainty. This can lead to issues. Returning prior returns.")
-        return implied_eq_returns
-
-    try:
-        Omega_inv = np.linalg.inv(Omega_matrix)
-    except np.linalg.LinAlgError as e:
-        print(f"CRITICAL ERROR: Omega matrix is singular and cannot be inverted: {e}. Returning prior returns.")
+        log.warning("Omega matrix contains zero uncertainty. This can lead to issues. Returning prior returns.")
         return implied_eq_returns
 
+    # Equivalent "update" form of the posterior: Pi + tau*Sigma P^T (P tau*Sigma P^T + Omega)^-1 (Q - P Pi).
+    # The only system to solve is K x K (views), symmetric positive definite, so one Cholesky solve replaces
+    # inverting the N x N tau*Sigma and then solving the N x N precision system.
+    tau_sigma_P_T = (tau * cov_matrix) @ P_matrix.T # (N, K)
+    view_covariance = P_matrix @ tau_sigma_P_T + Omega_matrix # (K, K)
+    view_residual = Q_vector - P_matrix @ implied_eq_returns # (K, 1)
 
-    first_bracket = tau_sigma_inv + P_matrix.T @ Omega_inv @ P_matrix
-    second_bracket = tau_sigma_inv @ implied_eq_returns + P_matrix.T @ Omega_inv @ Q_vector
-    
     try:
-        posterior_expected_returns = np.linalg.inv(first_bracket) @ second_bracket
-    except np.linalg.LinAlgError as e:
-        print(f"CRITICAL ERROR: First bracket matrix is singular and cannot be inverted: {e}. Returning prior returns.")
-        return implied_eq_returns
+        view_adjustment = cho_solve(cho_factor(view_covariance), view_residual)
+    except np.linalg.LinAlgError:
+        # Not numerically positive definite; fall back to a general LU solve
+        try:
+            view_adjustment = np.linalg.solve(view_covariance, view_residual)
+        except np.linalg.LinAlgError as e:
+            log.error("View covariance matrix is singular and cannot be inverted: %s. Returning prior returns.", e)
+            return implied_eq_returns
 
+    posterior_expected_returns = implied_eq_returns + tau_sigma_P_T @ view_adjustment
     return posterior_expected_returns
 
 
 def calculate_optimal_weights(posterior_returns: np.ndarray,
                               cov_matrix: np.ndarray,
-                              risk_aversion: float) -> np.ndarray:
+                              risk_aversion: float,
+                              chol: Optional[np.ndarray] = None) -> np.ndarray:
     """
     Calculates optimal portfolio weights using a basic mean-variance approach
     based on posterior returns and covariance matrix.
@@ -297,6 +387,8 @@ def calculate_optimal_weights(posterior_returns: np.ndarray,
         posterior_returns: (N, 1) array of posterior expected returns.
         cov_matrix: (N, N) array of asset covariance matrix.
         risk_aversion: Scalar scaling factor for prior uncertainty.
+        chol: Optional lower-triangular Cholesky factor of cov_matrix that the caller already computed
+              (e.g. for Monte Carlo); skips factoring the covariance again.
 
     Returns:
         (N, 1) array of optimal portfolio weights, summing to 1.
@@ -310,20 +402,26 @@ def calculate_optimal_weights(posterior_returns: np.ndarray,
     elif posterior_returns.ndim == 1:
         posterior_returns = posterior_returns.reshape(-1, 1)
 
+    # Solve Sigma w = mu instead of forming Sigma^-1. A covariance matrix is SPD, so try the
+    # Cholesky route first and only fall back to a general LU solve if that fails.
     try:
-        cov_inv = np.linalg.inv(cov_matrix)
-    except np.linalg.LinAlgError as e:
-        print(f"CRITICAL ERROR: Covariance matrix is singular and cannot be inverted: {e}. Returning equal weights.")
-        return np.ones((len(posterior_returns), 1)) / len(posterior_returns)
+        cov_factor = (chol, True) if chol is not None else cho_factor(cov_matrix)
+        cov_solution = cho_solve(cov_factor, posterior_returns)
+    except np.linalg.LinAlgError:
+        try:
+            cov_solution = np.linalg.solve(cov_matrix, posterior_returns)
+        except np.linalg.LinAlgError as e:
+            log.error("Covariance matrix is singular and cannot be inverted: %s. Returning equal weights.", e)
+            return np.ones((len(posterior_returns), 1)) / len(posterior_returns)
 
 
-    unscaled_weights = cov_inv @ posterior_returns / risk_aversion
+    unscaled_weights = cov_solution / risk_aversion
 
     if np.sum(unscaled_weights) != 0:
         optimal_weights = unscaled_weights / np.sum(unscaled_weights)
     else:
-        print("WARNING: Sum of unscaled weights is zero. Cannot normalize. Returning equal weights.")
-        optimal_weights = np.ones_like(unscaled_weights) / len(optimal_weights)
+        log.warning("Sum of unscaled weights is zero. Cannot normalize. Returning equal weights.")
+        optimal_weights = np.ones_like(unscaled_weights) / len(unscaled_weights)
     
     if optimal_weights.ndim == 1:
         optimal_weights = optimal_weights.reshape(-1, 1)
@@ -333,15 +431,26 @@ def calculate_optimal_weights(posterior_returns: np.ndarray,
 # --- Test block for blacklitterman.py (will only run if blacklitterman.py is executed directly) ---
 if __name__ == "__main__":
     from datetime import datetime, timedelta # Import here for test block
+    from dotenv import load_dotenv
+
+    # Show the module's debug output when run standalone
+    logging.basicConfig(level=logging.DEBUG, format="%(levelname)s %(name)s: %(message)s")
+
+    # Load environment variables (for News API Key within this module if used standalone)
+    load_dotenv()
+    # NEWSAPI_API_KEY_FROM_ENV is only used by the standalone test block of blacklitterman.py
+    NEWSAPI_API_KEY_FROM_ENV = os.getenv("NEWSAPI_API_KEY")
+
+    if not NEWSAPI_API_KEY_FROM_ENV:
+        print("WARNING: NEWSAPI_API_KEY not found in .env. Sentiment views may be limited for standalone testing.")
 
     # Define a local fetch_news for the standalone test block ONLY
     def local_fetch_news_for_test(symbols: List[str]) -> Dict[str, List[str]]:
-        news_dict = {}
         if not NEWSAPI_API_KEY_FROM_ENV:
             print("ERROR: NEWSAPI_API_KEY is not configured for this standalone test.")
             return {sym: ["Dummy headline for sentiment analysis test."] for sym in symbols} # Provide dummy headlines
 
-        for symbol in symbols:
+        def fetch_one(symbol: str) -> List[str]:
             print(f"Fetching news for {symbol} (standalone test)...")
             url = "https://newsapi.org/v2/everything"
             params = {
@@ -349,19 +458,21 @@ if __name__ == "__main__":
                 "sortBy": "publishedAt",
                 "language": "en",
                 "pageSize": 5, # Reduced for test
-                "apiKey": NEWSAPI_API_KEY_FROM_ENV,
             }
             try:
-                response = requests.get(url, params=params, timeout=5)
+                response = _HTTP_SESSION.get(url, params=params, headers={"X-Api-Key": NEWSAPI_API_KEY_FROM_ENV}, timeout=5)
                 response.raise_for_status()
                 data = response.json()
-                news_dict[symbol] = [article['title'] for article in data.get('articles', []) if article.get('title')]
-                print(f"Retrieved {len(news_dict[symbol])} headlines for {symbol}.")
+                headlines = [article['title'] for article in data.get('articles', []) if article.get('title')]
+                print(f"Retrieved {len(headlines)} headlines for {symbol}.")
+                return headlines
             except Exception as e:
                 print(f"Error fetching test news for {symbol}: {e}. Using dummy headlines.")
-                news_dict[symbol] = ["Dummy headline for sentiment analysis test."] # Fallback for test
+                return ["Dummy headline for sentiment analysis test."] # Fallback for test
 
-        return news_dict
+        # Fire the per-symbol requests concurrently; 5 workers keeps us well inside NewsAPI's rate limit
+        with ThreadPoolExecutor(max_workers=5) as executor:
+            return dict(zip(symbols, executor.map(fetch_one, symbols)))
 
 
     print("--- Running standalone tests for blacklitterman.py ---")
@@ -1,22 +1,36 @@
 # main.py
 from fastapi import FastAPI, HTTPException, Query, Form, Depends
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
+from fastapi.responses import ORJSONResponse, Response
+from pydantic import BaseModel, Field
 import yfinance as yf
 import numpy as np
 import pandas as pd
-from datetime import datetime, date, timedelta
-from typing import List, Dict, Union, Optional
-import requests
+from datetime import datetime, timedelta
+from typing import List, Dict, Union, Optional, Tuple
+import httpx
+import asyncio
 import json
+import hashlib
+import logging
+from collections import OrderedDict
+import orjson
 import os
+import shutil
+import tempfile
+import threading
+import time
 from dotenv import load_dotenv
 
 # Load environment variables at the very beginning of the script execution
 load_dotenv()
 
 # Assuming auth.py is in the same directory
-from auth import register_user, login_user, load_users, save_users
+from auth import (
+    register_user, hash_password, check_password, apply_password_upgrade, login_result,
+    load_users_cached, get_users_index, update_users_cache, write_users_file, user_log_size, begin_users_write,
+    finish_users_write, save_users
+)
 
 # Import functions from your Blacklitterman and Monte Carlo modules
 from Blacklitterman import ( 
@@ -25,12 +39,19 @@ from Blacklitterman import (
     calculate_posterior_returns,
     calculate_optimal_weights
 )
+from data_cache import CACHE_DIR, download_prices, fetch_last_prices, ticker_history
 from monte_carlo import (
     get_MonteCarloPaths_CorrelatedMultiAsset,
-    simulate_portfolio_value
+    cholesky_with_jitter,
+    simulate_portfolio_value_from_array,
+    portfolio_path_stats,
+    warm_up_kernels
 )
 
-app = FastAPI()
+log = logging.getLogger(__name__)
+
+# orjson serializes several times faster than the stdlib encoder and handles numpy scalars natively
+app = FastAPI(default_response_class=ORJSONResponse)
 
 # --- API Keys ---
 FINNHUB_API_KEY = os.getenv("FINNHUB_API_KEY", "YOUR_FINNHUB_API_KEY_HERE") 
@@ -60,11 +81,28 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Maximum number of Gemini analysis calls in flight at once for a single news request
+GEMINI_MAX_CONCURRENCY = 8
+# Maximum number of Finnhub company-news calls in flight at once while initializing a portfolio
+FINNHUB_MAX_CONCURRENCY = 8
+
 # Define allowed periods for yfinance
 VALID_YFINANCE_PERIODS = ["1d", "5d", "1mo", "3mo", "6mo", "1y", "2y", "5y", "10y", "ytd", "max"]
 
+# --- Shared async HTTP client ---
+# One pooled client for every outbound Finnhub/Gemini call: keep-alive connections are reused across
+# requests and awaiting it never blocks the event loop (unlike requests.get inside async handlers).
+_http_client = httpx.AsyncClient(
+    limits=httpx.Limits(max_connections=100, max_keepalive_connections=20),
+    timeout=30.0
+)
+
+@app.on_event("shutdown")
+async def _close_http_client():
+    await _http_client.aclose()
+
 # --- Helper to fetch data from Finnhub ---
-def _get_finnhub_data(endpoint: str, params: dict = None):
+async def _get_finnhub_data(endpoint: str, params: dict = None):
     if not FINNHUB_API_KEY or FINNHUB_API_KEY == "YOUR_FINNHUB_API_KEY_HERE":
         raise HTTPException(status_code=500, detail="Finnhub API Key is not configured in the backend.")
 
@@ -75,13 +113,15 @@ def _get_finnhub_data(endpoint: str, params: dict = None):
         full_params.update(params)
 
     try:
-        response = requests.get(url, params=full_params)
+        # httpx rejects None query values, which requests silently dropped
+        full_params = {k: v for k, v in full_params.items() if v is not None}
+        response = await _http_client.get(url, params=full_params)
         response.raise_for_status() 
         data = response.json()
         if not data:
             return []
         return data
-    except requests.exceptions.HTTPError as e:
+    except httpx.HTTPStatusError as e:
         status_code = e.response.status_code
         detail = e.response.text
         print(f"Finnhub HTTP Error ({status_code}) for {endpoint}: {detail}")
@@ -90,7 +130,7 @@ def _get_finnhub_data(endpoint: str, params: dict = None):
         elif status_code == 429:
             raise HTTPException(status_code=429, detail=f"Finnhub API Rate Limit Exceeded: {detail}")
         raise HTTPException(status_code=status_code, detail=f"Finnhub API error: {detail}")
-    except requests.exceptions.ConnectionError:
+    except httpx.TransportError:
         print(f"Finnhub Connection Error for {endpoint}")
         raise HTTPException(status_code=503, detail="Could not connect to Finnhub API. Check internet connection.")
     except Exception as e:
@@ -98,7 +138,19 @@ def _get_finnhub_data(endpoint: str, params: dict = None):
         raise HTTPException(status_code=500, detail=f"An unexpected error occurred while fetching from Finnhub: {e}")
 
 # --- Helper to call Gemini API for AI Analysis ---
+# Finnhub keeps returning the same headlines across refreshes; each Gemini call costs ~1s, so successful
+# analyses are remembered per (title, summary) for a day. Bounded LRU of (timestamp, analysis) entries.
+GEMINI_CACHE_TTL_SECONDS = 24 * 60 * 60
+GEMINI_CACHE_MAX_ENTRIES = 1024
+_gemini_cache: "OrderedDict[str, tuple]" = OrderedDict()
+
 async def _get_gemini_analysis(news_title: str, news_summary: str) -> Dict:
+    cache_key = hashlib.blake2b(f"{news_title}\x00{news_summary}".encode(), digest_size=16).hexdigest()
+    cached = _gemini_cache.get(cache_key)
+    if cached and time.monotonic() - cached[0] < GEMINI_CACHE_TTL_SECONDS:
+        _gemini_cache.move_to_end(cache_key)
+        return cached[1]
+
     if not GEMINI_API_KEY or GEMINI_API_KEY == "YOUR_GEMINI_API_KEY_HERE":
         raise HTTPException(status_code=500, detail="Gemini API Key is not configured in the backend.")
 
@@ -164,7 +216,7 @@ async def _get_gemini_analysis(news_title: str, news_summary: str) -> Dict:
     }
 
     try:
-        response = requests.post(
+        response = await _http_client.post(
             f"https://generativelanguage.googleapis.com/v1beta/models/gemini-2.0-flash:generateContent?key={GEMINI_API_KEY}",
             headers=headers,
             json=payload
@@ -174,17 +226,22 @@ async def _get_gemini_analysis(news_title: str, news_summary: str) -> Dict:
         
         if result and result.get("candidates") and result["candidates"][0].get("content") and result["candidates"][0]["content"].get("parts"):
             llm_text_response = result["candidates"][0]["content"]["parts"][0]["text"]
-            return json.loads(llm_text_response)
+            analysis = json.loads(llm_text_response)
+            _gemini_cache[cache_key] = (time.monotonic(), analysis)
+            _gemini_cache.move_to_end(cache_key)
+            if len(_gemini_cache) > GEMINI_CACHE_MAX_ENTRIES:
+                _gemini_cache.popitem(last=False)
+            return analysis
         else:
             print(f"Gemini API returned unexpected structure: {result}")
             raise HTTPException(status_code=500, detail="Gemini API returned unexpected response structure.")
 
-    except requests.exceptions.HTTPError as e:
+    except httpx.HTTPStatusError as e:
         status_code = e.response.status_code
         detail = e.response.text
         print(f"Gemini HTTP Error ({status_code}): {detail}")
         raise HTTPException(status_code=status_code, detail=f"Gemini API error: {detail}")
-    except requests.exceptions.ConnectionError:
+    except httpx.TransportError:
         print("Gemini Connection Error")
         raise HTTPException(status_code=503, detail="Could not connect to Gemini API.")
     except json.JSONDecodeError:
@@ -195,12 +252,63 @@ async def _get_gemini_analysis(news_title: str, news_summary: str) -> Dict:
         raise HTTPException(status_code=500, detail=f"An unexpected error occurred with Gemini API: {e}")
 
 
+# --- Debounced users.json persistence ---
+# Watchlist edits update the in-memory user cache and return immediately; a background task coalesces
+# bursts of edits and rewrites users.json at most once per USERS_FLUSH_DELAY_SECONDS.
+USERS_FLUSH_DELAY_SECONDS = 0.5
+_users_dirty = asyncio.Event()
+_users_flusher_task: Optional[asyncio.Task] = None
+
+async def _users_flusher():
+    while True:
+        await _users_dirty.wait()
+        await asyncio.sleep(USERS_FLUSH_DELAY_SECONDS) # Let a burst of edits pile up
+        _users_dirty.clear()
+        try:
+            # Serialize on the event loop (a consistent snapshot), then do the file I/O on a worker thread
+            payload = json.dumps(load_users_cached(), indent=2)
+            log_offset = user_log_size() # Registrations logged so far are part of this snapshot
+            begin_users_write()
+            await asyncio.to_thread(write_users_file, payload, log_offset)
+            finish_users_write(written=True)
+        except Exception as e:
+            finish_users_write()
+            print(f"Error flushing users to disk: {e}")
+            _users_dirty.set() # Retry on the next cycle
+
+def _schedule_users_save(users_data: List[Dict]):
+    update_users_cache(users_data)
+    _users_dirty.set()
+
+@app.on_event("startup")
+async def _start_users_flusher():
+    global _users_flusher_task
+    _users_flusher_task = asyncio.create_task(_users_flusher())
+
+@app.on_event("startup")
+async def _warm_up_simulation_kernels():
+    # Pay the numba compile cost before serving, not on the first /initialize-data call
+    await asyncio.to_thread(warm_up_kernels)
+
+@app.on_event("shutdown")
+async def _clear_mc_paths_files():
+    # Memmapped path cubes only mean something to the process that created them, so only this process's
+    # directory is removed; other workers (or a still-serving old process) keep theirs
+    if _mc_paths_dir is not None:
+        shutil.rmtree(_mc_paths_dir, ignore_errors=True)
+
+@app.on_event("shutdown")
+async def _flush_users_on_shutdown():
+    if _users_flusher_task:
+        _users_flusher_task.cancel()
+    if _users_dirty.is_set():
+        save_users(load_users_cached())
+
 # --- User Session / Authentication Dependency (Simplified) ---
-def get_current_user_email(user_email: str = Query(None, description="Currently logged in user's email (for demo only)")):
-    if user_email:
-        users_data = load_users()
-        if any(user["email"] == user_email for user in users_data):
-            return user_email
+async def get_current_user_email(user_email: str = Query(None, description="Currently logged in user's email (for demo only)")):
+    # async so FastAPI runs it inline instead of dispatching to the threadpool; the user list is cached in auth.py
+    if user_email and user_email in get_users_index()["by_email"]:
+        return user_email
     return None
 
 # --- API Endpoints ---
@@ -208,7 +316,13 @@ def get_current_user_email(user_email: str = Query(None, description="Currently
 @app.post("/register")
 async def register(email: str = Form(...), password: str = Form(...)):
     print(f"Backend: Received registration request for email: {email}")
-    result = register_user(email, password)
+    # scrypt hashing takes tens of milliseconds, so only the hash runs on a worker thread; the user cache and
+    # registration log are only ever touched from the event loop (the users flusher relies on that)
+    if email in get_users_index()["by_email"]:
+        result = {"success": False, "message": "User already exists"} # Skip hashing for a known duplicate
+    else:
+        credentials = await asyncio.to_thread(hash_password, password)
+        result = register_user(email, password, credentials=credentials) # Re-checks for duplicates
     print(f"Backend: Registration result for {email}: {result}")
     if not result["success"]:
         raise HTTPException(status_code=400, detail=result["message"])
@@ -217,92 +331,134 @@ async def register(email: str = Form(...), password: str = Form(...)):
 @app.post("/login")
 async def login(email: str = Form(...), password: str = Form(...)):
     print(f"Backend: Received login request for email: {email}")
-    result = login_user(email, password)
+    # Only the scrypt check runs on a worker thread; a legacy-hash upgrade is applied back on the event loop
+    user = get_users_index()["by_email"].get(email)
+    matches = False
+    if user is not None:
+        matches, upgrade = await asyncio.to_thread(check_password, user, password)
+        if matches:
+            apply_password_upgrade(user, upgrade)
+    result = login_result(email, matches)
     print(f"Backend: Login result for {email}: {result}")
     if not result["success"]:
         raise HTTPException(status_code=401, detail=result["message"])
     return result
 
-@app.get("/api/stock/{symbol}/history")
+class StockHistoryRow(BaseModel):
+    Date: str
+    Open: float
+    High: float
+    Low: float
+    Close: float
+    Volume: float
+    Daily_Change_Percent: float
+
+HISTORY_BROWSER_CACHE_SECONDS = 60
+
+@app.get("/api/stock/{symbol}/history", response_model=List[StockHistoryRow])
 async def get_stock_history(
     symbol: str,
     period: str = Query("1y", description=f"Time period for historical data. Valid options: {', '.join(VALID_YFINANCE_PERIODS)}")
-) -> List[Dict[str, Union[str, float]]]:
+):
     if period not in VALID_YFINANCE_PERIODS:
         raise HTTPException(status_code=400, detail=f"Invalid period. Choose from: {', '.join(VALID_YFINANCE_PERIODS)}")
 
     try:
-        ticker = yf.Ticker(symbol.upper())
-        data = ticker.history(period=period)
+        data = ticker_history(symbol, period) # Shared with other callers; reset_index below copies it
 
         if data.empty:
             raise HTTPException(status_code=404, detail=f"No data found for {symbol.upper()} for the period {period}. Try a different symbol or period.")
 
         data = data.reset_index()
 
-        result = []
-        for i, row in data.iterrows():
-            close_price = float(row["Close"])
-            open_price = float(row["Open"])
-            volume = float(row["Volume"])
-            high_price = float(row["High"])
-            low_price = float(row["Low"])
-
-            daily_change_percent = 0.0
-            if i > 0:
-                prior_close = float(data.iloc[i-1]["Close"])
-                if prior_close != 0:
-                    daily_change_percent = ((close_price - prior_close) / prior_close) * 100
-
-            date_str = ""
-            if isinstance(row["Date"], datetime):
-                date_str = row["Date"].strftime("%Y-%m-%d")
-            elif isinstance(row["Date"], date):
-                date_str = row["Date"].strftime("%Y-%m-%d")
-            else:
-                date_str = str(row["Date"])
+        # Vectorized over the whole frame instead of iterrows(): one pct_change pass and one strftime pass
+        if pd.api.types.is_datetime64_any_dtype(data["Date"]):
+            data["Date"] = data["Date"].dt.strftime("%Y-%m-%d")
+        else:
+            data["Date"] = data["Date"].astype(str)
+        daily_change = data["Close"].pct_change().replace([np.inf, -np.inf], np.nan).fillna(0.0) # 0 for day one / zero prior close
+        data["Daily_Change_Percent"] = (daily_change * 100).round(2)
 
-            result.append({
-                "Date": date_str,
-                "Open": open_price,
-                "High": high_price,
-                "Low": low_price,
-                "Close": close_price,
-                "Volume": volume,
-                "Daily_Change_Percent": round(daily_change_percent, 2)
-            })
+        ohlcv_columns = ["Open", "High", "Low", "Close", "Volume"]
+        data[ohlcv_columns] = data[ohlcv_columns].astype(float)
 
-        return result
+        records = data[["Date"] + ohlcv_columns + ["Daily_Change_Percent"]].to_dict(orient="records")
+        # Already the StockHistoryRow shape, so serialize straight to bytes instead of validating every row
+        # History only changes once per trading day, so let the browser reuse it for a minute as well
+        return Response(content=orjson.dumps(records, option=orjson.OPT_SERIALIZE_NUMPY), media_type="application/json",
+                        headers={"Cache-Control": f"max-age={HISTORY_BROWSER_CACHE_SECONDS}"})
 
     except Exception as e:
         print(f"Error fetching data for {symbol} period {period}: {e}")
         raise HTTPException(status_code=500, detail=f"An error occurred while fetching stock data: {e}")
 
+# In-memory {(SYMBOL, detailed): (fetched_at, quote)} LRU so repeated quote requests within the TTL skip yfinance.
+# Only successful quotes are stored; errors are re-fetched on the next request.
+QUOTE_CACHE_TTL_SECONDS = 60
+QUOTE_CACHE_MAX_ENTRIES = 1024
+_quote_cache: "OrderedDict[Tuple[str, bool], tuple]" = OrderedDict()
+_quote_cache_lock = threading.Lock()
+
 @app.get("/api/stock/{symbol}/quote")
-async def get_stock_quote(symbol: str):
+async def get_stock_quote(
+    symbol: str,
+    detailed: bool = Query(True, description="Include name and key ratios (needs the slower full .info scrape)")
+):
     """
     Fetches real-time price, change, change percentage, and key ratios for a given stock symbol using yfinance.
+    With detailed=false only price/change (and market cap) are returned, from yfinance's lightweight fast_info.
+    """
+    cache_key = (symbol.upper(), detailed)
+    with _quote_cache_lock:
+        cached = _quote_cache.get(cache_key)
+        if cached and time.monotonic() - cached[0] < QUOTE_CACHE_TTL_SECONDS:
+            _quote_cache.move_to_end(cache_key)
+            return cached[1]
+
+    # yfinance is blocking, so run it on a worker thread; this lets concurrent callers (e.g. the watchlist) overlap
+    quote = await asyncio.to_thread(_fetch_stock_quote, symbol, detailed)
+    with _quote_cache_lock:
+        _quote_cache[cache_key] = (time.monotonic(), quote)
+        _quote_cache.move_to_end(cache_key)
+        if len(_quote_cache) > QUOTE_CACHE_MAX_ENTRIES:
+            _quote_cache.popitem(last=False)
+    return quote
+
+def _fast_info_value(fast_info, attr: str):
+    """Reads one fast_info field, treating yfinance's missing-data errors as None."""
+    try:
+        return getattr(fast_info, attr)
+    except Exception:
+        return None
+
+def _fetch_stock_quote(symbol: str, detailed: bool = True) -> Dict:
+    """
+    Blocking implementation of get_stock_quote.
     """
     try:
         ticker = yf.Ticker(symbol.upper())
-        info = ticker.info
+        # fast_info is lightweight and lazy (each field is fetched on first access); the full .info scrape is only
+        # needed for names and ratios. A detailed quote reads price and previous close from .info first, so
+        # fast_info's requests are only made for fields .info is missing.
+        fast_info = ticker.fast_info
+        info = ticker.info if detailed else {}
 
-        price = info.get("currentPrice") or info.get("regularMarketPrice")
-        previous_close = info.get("regularMarketPreviousClose") # Corrected: Use regularMarketPreviousClose directly
-        if previous_close is None: # Fallback if regularMarketPreviousClose is not directly available
-            previous_close = info.get("previousClose") # Fallback to generic previousClose
+        price = info.get("currentPrice") or info.get("regularMarketPrice") or _fast_info_value(fast_info, "last_price")
+        # Fall back to the generic previousClose if regularMarketPreviousClose is not directly available
+        previous_close = (info.get("regularMarketPreviousClose") or info.get("previousClose")
+                          or _fast_info_value(fast_info, "previous_close"))
 
         long_name = info.get("longName") or info.get("shortName") or symbol.upper()
 
         if price is None: # If price is still None, try getting from history
-            hist_data = ticker.history(period="1d", auto_adjust=True) # Get 1 day of historical data
+            hist_data = ticker_history(symbol, "1d") # Get 1 day of historical data
             if not hist_data.empty:
                 price = float(hist_data["Close"].iloc[-1])
                 if previous_close is None: # If previous_close is still none, try getting it from history
                     if len(hist_data) > 1: # Get previous close from history if available
                         previous_close = float(hist_data["Close"].iloc[-2])
                     else: # If only one day of data, try 2 days to get previous close
-                        prev_hist_data = ticker.history(period="2d", auto_adjust=True)
+                        prev_hist_data = ticker_history(symbol, "2d")
                         if len(prev_hist_data) > 1:
                             previous_close = float(prev_hist_data["Close"].iloc[-2])
                         else:
@@ -318,7 +474,8 @@ async def get_stock_quote(symbol: str):
             change = price - previous_close
             changesPercentage = (change / previous_close) * 100
 
-        market_cap = info.get("marketCap")
+        # fast_info's market_cap costs a separate shares lookup, so the summary quote (e.g. the watchlist) skips it
+        market_cap = info.get("marketCap") or (_fast_info_value(fast_info, "market_cap") if detailed else None)
         trailing_pe = info.get("trailingPE")
         forward_eps = info.get("forwardEps")
         dividend_yield = info.get("dividendYield")
@@ -347,6 +504,25 @@ async def get_stock_quote(symbol: str):
         raise HTTPException(status_code=500, detail=f"Could not fetch real-time quote/ratios using yfinance: {e}")
 
 
+# Display names for the empty-query fallback. These never change, so they are stored here instead of
+# scraping yf.Ticker(sym).info for each symbol on every request.
+POPULAR_STOCKS = {
+    "AAPL": "Apple Inc.",
+    "MSFT": "Microsoft Corporation",
+    "GOOG": "Alphabet Inc.",
+    "AMZN": "Amazon.com, Inc.",
+    "NVDA": "NVIDIA Corporation",
+    "TSLA": "Tesla, Inc.",
+    "JPM": "JPMorgan Chase & Co.",
+    "GS": "The Goldman Sachs Group, Inc.",
+    "XOM": "Exxon Mobil Corporation",
+    "CVX": "Chevron Corporation",
+    "PG": "The Procter & Gamble Company",
+    "KO": "The Coca-Cola Company",
+    "PEP": "PepsiCo, Inc.",
+}
+_POPULAR_STOCKS_RESULTS = [{"symbol": sym, "name": name} for sym, name in POPULAR_STOCKS.items()]
+
 @app.get("/api/search_stocks")
 async def search_stocks(query: str = Query("", min_length=0)):
     """
@@ -356,24 +532,10 @@ async def search_stocks(query: str = Query("", min_length=0)):
     try:
         if not query:
             # Fallback to popular symbols if query is empty, as specified by user
-            popular_symbols_for_empty_query = [
-                "AAPL", "MSFT", "GOOG", "AMZN", "NVDA", "TSLA",
-                "JPM", "GS", "XOM", "CVX", "PG", "KO", "PEP"
-            ]
-            results = []
-            for sym in popular_symbols_for_empty_query:
-                try:
-                    ticker_info = yf.Ticker(sym).info
-                    results.append({
-                        "symbol": sym,
-                        "name": ticker_info.get("longName") or ticker_info.get("shortName") or sym
-                    })
-                except Exception as e:
-                    print(f"Warning: Could not get info for popular symbol {sym}: {e}")
-            return results
+            return _POPULAR_STOCKS_RESULTS
         
         # Use Finnhub for actual search queries
-        finnhub_results = _get_finnhub_data("search", params={"q": query})
+        finnhub_results = await _get_finnhub_data("search", params={"q": query})
         
         results = []
         for item in finnhub_results.get("result", []):
@@ -392,9 +554,21 @@ async def search_stocks(query: str = Query("", min_length=0)):
         raise HTTPException(status_code=500, detail=f"Could not perform stock search using Finnhub: {e}")
 
 # --- News Endpoints ---
-async def _process_news_article_with_gemini(news_item: Dict) -> Dict:
+def _format_time_ago(timestamp: float, now_ts: float) -> str:
+    """Formats a Unix timestamp as "X days/hours/minutes ago" using plain integer arithmetic."""
+    delta = int(now_ts - timestamp)
+    if delta >= 86400:
+        return f"{delta // 86400} days ago"
+    elif delta >= 3600:
+        return f"{delta // 3600} hours ago"
+    elif delta >= 60:
+        return f"{delta // 60} minutes ago"
+    return "just now"
+
+async def _process_news_article_with_gemini(news_item: Dict, now_ts: Optional[float] = None) -> Dict:
     """
     Processes a single news article with Gemini API for analysis.
+    now_ts is the batch's shared "current time" (Unix seconds); defaults to time.time().
     """
     title = news_item.get("headline", "")
     summary = news_item.get("summary", "")
@@ -405,20 +579,9 @@ async def _process_news_article_with_gemini(news_item: Dict) -> Dict:
     # Convert timestamp to human-readable format
     if timestamp:
         try:
-            # Finnhub datetime is Unix timestamp (seconds)
-            dt_object = datetime.fromtimestamp(timestamp)
-            # Format as "X hours ago", etc.
-            now = datetime.now()
-            diff = now - dt_object
-            if diff.days > 0:
-                time_ago = f"{diff.days} days ago"
-            elif diff.seconds >= 3600:
-                time_ago = f"{int(diff.seconds / 3600)} hours ago"
-            elif diff.seconds >= 60:
-                time_ago = f"{int(diff.seconds / 60)} minutes ago"
-            else:
-                time_ago = "just now"
-        except Exception:
+            # Finnhub datetime is Unix timestamp (seconds), so no datetime objects are needed
+            time_ago = _format_time_ago(float(timestamp), time.time() if now_ts is None else now_ts)
+        except (TypeError, ValueError):
             time_ago = "N/A"
     else:
         time_ago = "N/A"
@@ -472,11 +635,36 @@ async def get_financial_news(
     Fetches top financial news from Finnhub and processes them with Gemini AI.
     """
     try:
-        finnhub_news = _get_finnhub_data("news", params={"category": category, "minSentiment": min_sentiment, "maxSentiment": min_sentiment, "limit": limit}) # min/max sentiment seems incorrect usage here
-        
-        processed_news = []
+        finnhub_news = await _get_finnhub_data("news", params={"category": category, "minSentiment": min_sentiment, "maxSentiment": max_sentiment, "limit": limit})
+
+        # Every article sent on costs a Gemini round-trip, so drop ones with nothing to analyze and
+        # duplicates (Finnhub can repeat an id) before the batch is built
+        seen_ids = set()
+        unique_news = []
         for news_item in finnhub_news:
-            processed_news.append(await _process_news_article_with_gemini(news_item))
+            if not news_item.get("headline") or not news_item.get("summary"):
+                continue
+            news_id = news_item.get("id")
+            if news_id is not None:
+                if news_id in seen_ids:
+                    continue
+                seen_ids.add(news_id)
+            unique_news.append(news_item)
+        finnhub_news = unique_news
+        
+        # Analyze all articles concurrently (bounded so we stay inside Gemini's rate limit)
+        gemini_semaphore = asyncio.Semaphore(GEMINI_MAX_CONCURRENCY)
+        now_ts = time.time() # One "now" for the whole batch
+
+        async def process_with_limit(news_item: Dict) -> Dict:
+            async with gemini_semaphore:
+                return await _process_news_article_with_gemini(news_item, now_ts)
+
+        results = await asyncio.gather(*[process_with_limit(news_item) for news_item in finnhub_news], return_exceptions=True)
+        processed_news = [result for result in results if not isinstance(result, BaseException)]
+        for result in results:
+            if isinstance(result, BaseException):
+                print(f"Warning: Skipping news article that failed processing: {result}")
 
         categories_data = {
             "all": len(processed_news),
@@ -504,33 +692,30 @@ async def get_watchlist(current_user_email: str = Depends(get_current_user_email
     if not current_user_email:
         raise HTTPException(status_code=401, detail="Authentication required.")
 
-    users_data = load_users()
+    users_data = load_users_cached()
     user_info = next((user for user in users_data if user["email"] == current_user_email), None)
 
     if user_info and "watchlist" in user_info:
+        # Fetch every quote concurrently instead of one network round-trip after another
+        quotes = await asyncio.gather(
+            *[get_stock_quote(item["symbol"], detailed=False) for item in user_info["watchlist"]], # Only price/change are shown
+            return_exceptions=True
+        )
+
         watchlist_with_prices = []
-        for item in user_info["watchlist"]:
-            try:
-                quote = await get_stock_quote(item["symbol"])
-                watchlist_with_prices.append({
-                    "symbol": item["symbol"],
-                    "name": item["name"],
-                    "price": quote.get("price", 'N/A'),
-                    "change": quote.get("change", 'N/A'),
-                    "changesPercentage": quote.get("changesPercentage", 'N/A')
-                })
-            except HTTPException as e:
-                print(f"Warning: Could not fetch price for watchlist item {item['symbol']}: {e.detail}")
+        for item, quote in zip(user_info["watchlist"], quotes):
+            if isinstance(quote, HTTPException):
+                print(f"Warning: Could not fetch price for watchlist item {item['symbol']}: {quote.detail}")
                 watchlist_with_prices.append({
                     "symbol": item["symbol"],
                     "name": item["name"],
                     "price": 'N/A',
                     "change": 'N/A',
                     "changesPercentage": 'N/A',
-                    "error": e.detail
+                    "error": quote.detail
                 })
-            except Exception as e:
-                print(f"Warning: Unexpected error fetching price for watchlist item {item['symbol']}: {e}")
+            elif isinstance(quote, Exception):
+                print(f"Warning: Unexpected error fetching price for watchlist item {item['symbol']}: {quote}")
                 watchlist_with_prices.append({
                     "symbol": item["symbol"],
                     "name": item["name"],
@@ -539,6 +724,14 @@ async def get_watchlist(current_user_email: str = Depends(get_current_user_email
                     "changesPercentage": 'N/A',
                     "error": "Failed to fetch price"
                 })
+            else:
+                watchlist_with_prices.append({
+                    "symbol": item["symbol"],
+                    "name": item["name"],
+                    "price": quote.get("price", 'N/A'),
+                    "change": quote.get("change", 'N/A'),
+                    "changesPercentage": quote.get("changesPercentage", 'N/A')
+                })
         return {"watchlist": watchlist_with_prices}
     return {"watchlist": []}
 
@@ -551,25 +744,20 @@ async def add_to_watchlist(
     if not current_user_email:
         raise HTTPException(status_code=401, detail="Authentication required.")
 
-    users_data = load_users()
-    user_found = False
-    for i, user in enumerate(users_data):
-        if user["email"] == current_user_email:
-            user_found = True
-            if "watchlist" not in user:
-                user["watchlist"] = []
-            
-            if any(item["symbol"] == symbol for item in user["watchlist"]):
-                raise HTTPException(status_code=400, detail="Stock is already in watchlist.")
-
-            user["watchlist"].append({"symbol": symbol, "name": name})
-            users_data[i] = user
-            save_users(users_data)
-            return {"success": True, "message": f"{symbol} added to watchlist."}
-    
-    if not user_found:
+    users_data = load_users_cached()
+    # by_email holds the same dicts as users_data, so mutating the record updates the list in place
+    index = get_users_index()
+    user = index["by_email"].get(current_user_email)
+    if user is None:
         raise HTTPException(status_code=404, detail="User not found for watchlist operation.")
 
+    if symbol in index["symbols_by_email"].get(current_user_email, set()):
+        raise HTTPException(status_code=400, detail="Stock is already in watchlist.")
+
+    user.setdefault("watchlist", []).append({"symbol": symbol, "name": name})
+    _schedule_users_save(users_data)
+    return {"success": True, "message": f"{symbol} added to watchlist."}
+
 @app.post("/api/watchlist/remove")
 async def remove_from_watchlist(
     symbol: str = Form(...),
@@ -578,48 +766,49 @@ async def remove_from_watchlist(
     if not current_user_email:
         raise HTTPException(status_code=401, detail="Authentication required.")
 
-    users_data = load_users()
-    user_found = False
-    for i, user in enumerate(users_data):
-        if user["email"] == current_user_email:
-            user_found = True
-            if "watchlist" in user:
-                initial_len = len(user["watchlist"])
-                user["watchlist"] = [item for item in user["watchlist"] if item["symbol"] != symbol]
-                if len(user["watchlist"]) == initial_len:
-                    raise HTTPException(status_code=404, detail=f"{symbol} not found in watchlist.")
-                users_data[i] = user
-                save_users(users_data)
-                return {"success": True, "message": f"{symbol} removed from watchlist."}
-            else:
-                raise HTTPException(status_code=404, detail="Watchlist is empty for this user.")
-    
-    if not user_found:
+    users_data = load_users_cached()
+    index = get_users_index()
+    user = index["by_email"].get(current_user_email)
+    if user is None:
         raise HTTPException(status_code=404, detail="User not found for watchlist operation.")
 
+    if "watchlist" not in user:
+        raise HTTPException(status_code=404, detail="Watchlist is empty for this user.")
+    if symbol not in index["symbols_by_email"].get(current_user_email, set()):
+        raise HTTPException(status_code=404, detail=f"{symbol} not found in watchlist.")
+
+    user["watchlist"] = [item for item in user["watchlist"] if item["symbol"] != symbol]
+    _schedule_users_save(users_data)
+    return {"success": True, "message": f"{symbol} removed from watchlist."}
+
 # --- Portfolio Simulation Endpoints ---
 
+# Bounds for the simulation/model parameters. Out-of-range requests are rejected with a 422 before the
+# handler runs, instead of running Monte Carlo on (or dividing by) a zero horizon.
+MAX_TIME_INTERVALS = 2520 # 10 years of trading days
+MAX_SIMULATIONS = 1_000_000
+
 class StockSelectionRequest(BaseModel):
     symbols: List[str]
     historicalPeriod: str = "10y"
-    numTimeIntervals: int = 252
-    numSimulations: int = 2000
-    riskAversionBL: float = 2.5
-    tauBL: float = 0.05
-    riskAversionOpt: float = 3.0
+    numTimeIntervals: int = Field(252, gt=0, le=MAX_TIME_INTERVALS)
+    numSimulations: int = Field(2000, gt=0, le=MAX_SIMULATIONS)
+    riskAversionBL: float = Field(2.5, gt=0)
+    tauBL: float = Field(0.05, gt=0, le=1.0)
+    riskAversionOpt: float = Field(3.0, gt=0, le=20)
 
 class UserWeightsRequest(BaseModel):
     symbols: List[str]
     weights: Dict[str, float] # Example: { "AAPL": 0.5, "MSFT": 0.5 }
     initialPortfolioValue: float = 100000
-    # The following parameters are implicitly consistent with the cached data
-    # but could be sent for validation or if caching strategy changes
-    historicalPeriod: str = "1y" # For context/validation, if needed
-    numTimeIntervals: int = 252 # For stats calculation consistency
-    numSimulations: int = 2000 # For stats calculation consistency
-    riskAversionBL: float = 2.5
-    tauBL: float = 0.05
-    riskAversionOpt: float = 3.0
+    # The model parameters come from the cached /initialize-data entry. They are optional here and, when sent,
+    # are only checked against that entry (None = use whatever the portfolio was initialized with)
+    historicalPeriod: Optional[str] = None
+    numTimeIntervals: Optional[int] = Field(None, gt=0, le=MAX_TIME_INTERVALS)
+    numSimulations: Optional[int] = Field(None, gt=0, le=MAX_SIMULATIONS)
+    riskAversionBL: Optional[float] = Field(None, gt=0)
+    tauBL: Optional[float] = Field(None, gt=0, le=1.0)
+    riskAversionOpt: Optional[float] = Field(None, gt=0, le=20)
 
 class PortfolioStatsResponse(BaseModel):
     expectedReturn: float
@@ -645,8 +834,106 @@ class SimulatePortfolioResponse(BaseModel):
 
 # In-memory storage for cached data. NOT suitable for production (use DB/Redis).
 # This is to avoid recalculating BL model and full MC paths for every weight change.
-_cached_portfolio_data: Dict[str, Union[np.ndarray, List[str], Dict, float]] = {}
-_LAST_REQUEST_PARAMS: Dict = {} # To check if parameters change and trigger re-initialization
+# Small LRU keyed by the symbol set, so several portfolios can be live at once instead of each new symbol
+# selection clobbering the previous one. Each entry records the model parameters it was built with.
+PORTFOLIO_CACHE_MAX_ENTRIES = 32
+_cached_portfolio_data: "OrderedDict[frozenset, Dict[str, Union[np.ndarray, List[str], Dict, float]]]" = OrderedDict()
+
+# Request fields that shape the cached model and paths
+PORTFOLIO_PARAM_FIELDS = ('historicalPeriod', 'numTimeIntervals', 'numSimulations', 'riskAversionBL', 'tauBL',
+                          'riskAversionOpt')
+
+def _portfolio_cache_key(symbols: List[str]) -> frozenset:
+    """
+    Cache key for a symbol set. /simulate only sends the symbols (and weights), so the key must not depend on
+    the model parameters. A frozenset is one O(N) hash pass (no sort) and, like the old set comparison,
+    ignores order and duplicates.
+    """
+    return frozenset(symbols)
+
+def _portfolio_params(request: StockSelectionRequest) -> Dict[str, Union[str, int, float]]:
+    """The model parameters of an /initialize-data request, stored with its cache entry."""
+    return {field: getattr(request, field) for field in PORTFOLIO_PARAM_FIELDS}
+
+def _conflicting_params(cached_params: Dict[str, Union[str, int, float]], request: UserWeightsRequest) -> List[str]:
+    """Names of the parameters a /simulate request sent explicitly (non-None) that differ from the cached entry's."""
+    return [field for field in PORTFOLIO_PARAM_FIELDS
+            if getattr(request, field) is not None and getattr(request, field) != cached_params[field]]
+
+def _get_cached_portfolio(key: frozenset) -> Optional[Dict]:
+    entry = _cached_portfolio_data.get(key)
+    if entry is not None:
+        _cached_portfolio_data.move_to_end(key)
+    return entry
+
+def _store_cached_portfolio(keys: List[frozenset], entry: Dict):
+    # Re-initializing a symbol set with new parameters replaces its entry, which drops the old one like an eviction
+    dropped = [_cached_portfolio_data[key] for key in keys if key in _cached_portfolio_data]
+    for key in keys:
+        _cached_portfolio_data[key] = entry
+        _cached_portfolio_data.move_to_end(key)
+    while len(_cached_portfolio_data) > PORTFOLIO_CACHE_MAX_ENTRIES:
+        dropped.append(_cached_portfolio_data.popitem(last=False)[1])
+    for evicted in {id(evicted): evicted for evicted in dropped}.values():
+        # Entries can sit under two keys; only drop the paths file once nothing references the entry
+        if evicted is not entry and not any(other is evicted for other in _cached_portfolio_data.values()):
+            _remove_mc_paths_file(evicted['mc_paths'])
+
+# Cached Monte Carlo cubes live in .npy files mapped into memory rather than on the heap, so the OS page
+# cache (not process RSS) holds them and cold portfolios can be paged out. Each process writes into its own
+# mkdtemp directory under CACHE_DIR, created on first use and removed on shutdown.
+_mc_paths_dir: Optional[str] = None
+
+def _new_mc_paths_file(shape: tuple) -> np.memmap:
+    """Creates a writable float32 .npy memmap of the given shape in this process's paths directory."""
+    global _mc_paths_dir
+    if _mc_paths_dir is None or not os.path.isdir(_mc_paths_dir):
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        _mc_paths_dir = os.path.abspath(tempfile.mkdtemp(prefix='mc_paths-', dir=CACHE_DIR))
+    fd, path = tempfile.mkstemp(suffix='.npy', dir=_mc_paths_dir)
+    os.close(fd)
+    return np.lib.format.open_memmap(path, mode='w+', dtype=np.float32, shape=shape)
+
+def _remove_mc_paths_file(mc_paths: np.ndarray):
+    """Deletes the file behind a cached paths memmap (views that are still in use keep their mapping)."""
+    if isinstance(mc_paths, np.memmap) and mc_paths.filename:
+        try:
+            os.remove(mc_paths.filename)
+        except OSError as e:
+            print(f"Warning: Could not remove cached Monte Carlo paths file {mc_paths.filename}: {e}")
+
+# {SYMBOL: (fetched_at, headlines)} so re-initializing with overlapping symbols skips Finnhub
+COMPANY_NEWS_CACHE_TTL_SECONDS = 30 * 60
+COMPANY_NEWS_CACHE_MAX_ENTRIES = 512
+_company_headlines_cache: "OrderedDict[str, tuple]" = OrderedDict()
+
+async def _get_company_headlines(sym: str, from_date: str, to_date: str, semaphore: asyncio.Semaphore) -> List[str]:
+    """
+    Returns up to 5 Finnhub company-news headlines for sym between from_date and to_date (YYYY-MM-DD),
+    for VADER sentiment views.
+    Failures are logged and yield an empty list so one bad symbol never fails initialization.
+    """
+    cached = _company_headlines_cache.get(sym)
+    if cached and time.monotonic() - cached[0] < COMPANY_NEWS_CACHE_TTL_SECONDS:
+        return cached[1]
+
+    try:
+        async with semaphore:
+            finnhub_company_news = await _get_finnhub_data("company-news", params={"symbol": sym, "from": from_date, "to": to_date})
+    except HTTPException as e:
+        print(f"Warning: Failed to fetch Finnhub company news for {sym} during sentiment view generation: {e.detail}")
+        return []
+    except Exception as e:
+        print(f"Warning: Unexpected error fetching news for {sym} for sentiment: {e}")
+        return []
+
+    # Extract just the headlines from Finnhub news for VADER
+    headlines_list = [article['headline'] for article in finnhub_company_news if 'headline' in article][:5] # Limit to top 5 headlines
+    _company_headlines_cache[sym] = (time.monotonic(), headlines_list)
+    _company_headlines_cache.move_to_end(sym)
+    if len(_company_headlines_cache) > COMPANY_NEWS_CACHE_MAX_ENTRIES:
+        _company_headlines_cache.popitem(last=False)
+    return headlines_list
 
 @app.post("/api/portfolio/initialize-data", response_model=InitializeDataResponse)
 async def initialize_portfolio_data(request: StockSelectionRequest):
@@ -655,139 +942,164 @@ async def initialize_portfolio_data(request: StockSelectionRequest):
     Calculates Black-Litterman optimal weights.
     Caches data for subsequent simulation requests.
     """
-    # Check if parameters (symbols, periods, etc.) have changed, forcing re-initialization
-    current_params_hash = hash(json.dumps(request.dict(), sort_keys=True)) # Consistent hash
-    global _LAST_REQUEST_PARAMS # Use global to modify the variable
-    
-    if _LAST_REQUEST_PARAMS.get("hash") != current_params_hash: # Check if hash changed
-        print(f"Parameters changed or first request ({request.symbols}). Re-initializing portfolio data.")
-        _LAST_REQUEST_PARAMS = {"hash": current_params_hash, "params": request.dict()}
-        _cached_portfolio_data.clear() # Clear cache on new parameters/symbols
+    # Same symbols and parameters as an earlier request: reuse its model and paths
+    cache_key = _portfolio_cache_key(request.symbols)
+    cached_entry = _get_cached_portfolio(cache_key)
+    if cached_entry is not None and cached_entry['params'] == _portfolio_params(request):
+        return Response(content=cached_entry['response'], media_type="application/json")
 
-    if not _cached_portfolio_data:
-        print(f"Backend: Running full initialization for {request.symbols}...")
-        try:
-            implied_eq_returns_daily, cov_matrix_daily_np, actual_symbols_processed = \
-                get_implied_equilibrium_returns_and_cov(
-                    symbols=request.symbols,
-                    period=request.historicalPeriod,
-                    risk_aversion=request.riskAversionBL
-                )
-
-            if not actual_symbols_processed:
-                # If get_implied_equilibrium_returns_and_cov returns empty symbols, raise error
-                raise HTTPException(status_code=400, detail="No valid assets could be processed for initialization after yfinance download.")
-
-            # Sentiment views for Black-Litterman
-            # NEW: Fetch news headlines from Finnhub here, then pass to get_sentiment_based_views
-            news_headlines_for_sentiment = {}
-            for sym in actual_symbols_processed:
-                try:
-                    # Get company news for each stock (limit to 5 articles for less Gemini usage)
-                    # Using (datetime.now() - timedelta(days=30)).strftime("%Y-%m-%d") for 'from' date
-                    finnhub_company_news = _get_finnhub_data("company-news", params={"symbol": sym, "from": (datetime.now() - timedelta(days=30)).strftime("%Y-%m-%d"), "to": datetime.now().strftime("%Y-%m-%d")})
-                    # Extract just the headlines from Finnhub news for VADER
-                    headlines_list = [article['headline'] for article in finnhub_company_news if 'headline' in article][:5] # Limit to top 5 headlines
-                    news_headlines_for_sentiment[sym] = headlines_list
-                except HTTPException as e:
-                    print(f"Warning: Failed to fetch Finnhub company news for {sym} during sentiment view generation: {e.detail}")
-                    news_headlines_for_sentiment[sym] = []
-                except Exception as e:
-                    print(f"Warning: Unexpected error fetching news for {sym} for sentiment: {e}")
-                    news_headlines_for_sentiment[sym] = []
-
-            P_matrix, Q_vector, Omega_matrix = get_sentiment_based_views(
-                symbols=actual_symbols_processed, 
-                cov_matrix=cov_matrix_daily_np,
-                headlines_dict=news_headlines_for_sentiment # Pass headlines to blacklitterman
-            )
-
-            # Black-Litterman optimal weights
-            bl_posterior_returns = calculate_posterior_returns(
-                implied_eq_returns=implied_eq_returns_daily,
-                cov_matrix=cov_matrix_daily_np,
-                P_matrix=P_matrix,
-                Q_vector=Q_vector,
-                Omega_matrix=Omega_matrix,
-                tau=request.tauBL
-            )
-            bl_optimal_weights_np = calculate_optimal_weights(
-                posterior_returns=bl_posterior_returns,
-                cov_matrix=cov_matrix_daily_np,
-                risk_aversion=request.riskAversionOpt
+    print(f"Backend: Running full initialization for {request.symbols}...")
+    try:
+        # One batched history download, shared by Black-Litterman and the Monte Carlo drift estimate.
+        # Run off the event loop so other requests keep being served while yfinance works.
+        price_data = await asyncio.to_thread(download_prices, request.symbols, request.historicalPeriod)
+
+        implied_eq_returns_daily, cov_matrix_daily_np, actual_symbols_processed = \
+            get_implied_equilibrium_returns_and_cov(
+                symbols=request.symbols,
+                period=request.historicalPeriod,
+                risk_aversion=request.riskAversionBL,
+                data=price_data
             )
-            # Ensure bl_optimal_weights is always a dictionary, even if bl_optimal_weights_np is empty
-            bl_optimal_weights = {sym: round(float(bl_optimal_weights_np[i, 0]), 4) for i, sym in enumerate(actual_symbols_processed)}
 
+        if not actual_symbols_processed:
+            # If get_implied_equilibrium_returns_and_cov returns empty symbols, raise error
+            raise HTTPException(status_code=400, detail="No valid assets could be processed for initialization after yfinance download.")
+
+        # Sentiment views for Black-Litterman
+        # NEW: Fetch news headlines from Finnhub here, then pass to get_sentiment_based_views
+        # All symbols are fetched concurrently (bounded for Finnhub's rate limit) instead of one after another
+        # Same 30-day window for every symbol, formatted once
+        today = datetime.now()
+        to_date = today.strftime("%Y-%m-%d")
+        from_date = (today - timedelta(days=30)).strftime("%Y-%m-%d")
+        finnhub_semaphore = asyncio.Semaphore(FINNHUB_MAX_CONCURRENCY)
+        headline_lists = await asyncio.gather(
+            *[_get_company_headlines(sym, from_date, to_date, finnhub_semaphore) for sym in actual_symbols_processed]
+        )
+        news_headlines_for_sentiment = dict(zip(actual_symbols_processed, headline_lists))
 
-            # Pre-simulate asset paths (ALL iterations for subsequent use)
-            all_simulated_asset_paths_dict = get_MonteCarloPaths_CorrelatedMultiAsset(
-                symbols=actual_symbols_processed,
-                cov_matrix=cov_matrix_daily_np,
-                period=request.historicalPeriod, # Consistency
-                time_intervals=request.numTimeIntervals,
-                iteration=request.numSimulations
-            )
-            # CRITICAL: If all_simulated_asset_paths_dict is empty (meaning no stock data was good enough for MC)
-            if not all_simulated_asset_paths_dict:
-                raise HTTPException(status_code=400, detail="Monte Carlo simulation failed for all selected stocks during initialization.")
+        P_matrix, Q_vector, Omega_matrix = get_sentiment_based_views(
+            symbols=actual_symbols_processed, 
+            cov_matrix=cov_matrix_daily_np,
+            headlines_dict=news_headlines_for_sentiment # Pass headlines to blacklitterman
+        )
 
+        # Black-Litterman optimal weights
+        bl_posterior_returns = calculate_posterior_returns(
+            implied_eq_returns=implied_eq_returns_daily,
+            cov_matrix=cov_matrix_daily_np,
+            P_matrix=P_matrix,
+            Q_vector=Q_vector,
+            Omega_matrix=Omega_matrix,
+            tau=request.tauBL
+        )
+        # The covariance is fixed for this cache entry, so factor it once and share the factor between
+        # the mean-variance solve and Monte Carlo (and keep it with the cached entry)
+        cholesky_matrix = cholesky_with_jitter(cov_matrix_daily_np)
+
+        bl_optimal_weights_np = calculate_optimal_weights(
+            posterior_returns=bl_posterior_returns,
+            cov_matrix=cov_matrix_daily_np,
+            risk_aversion=request.riskAversionOpt,
+            chol=cholesky_matrix
+        )
+        # Ensure bl_optimal_weights is always a dictionary, even if bl_optimal_weights_np is empty
+        bl_optimal_weights = {sym: round(float(bl_optimal_weights_np[i, 0]), 4) for i, sym in enumerate(actual_symbols_processed)}
+
+
+        # Pre-simulate asset paths (ALL iterations for subsequent use). Run on a worker thread: the simulation
+        # kernels release the GIL, so the event loop and other initializations keep going meanwhile
+        simulated_symbols, simulated_paths = await asyncio.to_thread(
+            get_MonteCarloPaths_CorrelatedMultiAsset,
+            symbols=actual_symbols_processed,
+            cov_matrix=cov_matrix_daily_np,
+            period=request.historicalPeriod, # Consistency
+            time_intervals=request.numTimeIntervals,
+            iteration=request.numSimulations,
+            data=price_data,
+            dtype=np.float32, # Paths are cached per portfolio; float32 halves their footprint
+            cholesky_matrix=cholesky_matrix
+        )
+        # CRITICAL: If no symbols were simulated (meaning no stock data was good enough for MC)
+        if not simulated_symbols:
+            raise HTTPException(status_code=400, detail="Monte Carlo simulation failed for all selected stocks during initialization.")
+        if simulated_symbols != actual_symbols_processed: # Rows must line up with the weights and covariance
+            raise ValueError(f"Monte Carlo simulated {simulated_symbols}, expected {actual_symbols_processed}.")
+
+
+        # The float32 (N, T, I) cube in 'actual_symbols_processed' order, copied in one block into a memory-mapped
+        # .npy file; everything below (fallback prices, median paths) and /simulate work off it
+        mc_paths = _new_mc_paths_file(simulated_paths.shape)
+        # Until the entry is stored in the cache nothing else will delete the file, so remove it on any failure
+        # (including cancellation while awaiting the price fetch)
+        try:
+            mc_paths[:] = simulated_paths
+            mc_paths.flush()
+            del simulated_paths # Only the mapped copy is kept
 
             # Get current prices for individual stock plots (frontend)
-            current_prices = {}
-            for sym in actual_symbols_processed:
-                try:
-                    # Fetching 1-day history is fast for just the last price
-                    hist_data = yf.download(sym, period='1d', auto_adjust=True, progress=False)
-                    if not hist_data.empty and 'Close' in hist_data.columns:
-                         current_prices[sym] = hist_data['Close'].iloc[-1].item()
-                    elif not hist_data.empty and 'Adj Close' in hist_data.columns: # Check not empty as well
-                         current_prices[sym] = hist_data['Adj Close'].iloc[-1].item()
-                    else:
-                        # Fallback to simulated start price if yfinance fails
-                        # Use .get() and default values to prevent error if sym not in all_simulated_asset_paths_dict
-                        current_prices[sym] = all_simulated_asset_paths_dict.get(sym, np.array([[0.0]]))[0,0].item()
-                except Exception as e:
-                    print(f"Warning: Could not get last historical price for {sym} during init: {e}")
-                    current_prices[sym] = all_simulated_asset_paths_dict.get(sym, np.array([[0.0]]))[0,0].item()
+            try:
+                last_prices = await asyncio.to_thread(fetch_last_prices, actual_symbols_processed)
+            except Exception as e:
+                print(f"Warning: Could not get last historical prices for {actual_symbols_processed} during init: {e}")
+                last_prices = {}
+            # Fallback to simulated start price if yfinance fails
+            start_prices = mc_paths[:, 0, 0].tolist() if mc_paths.size else [0.0] * len(actual_symbols_processed)
+            current_prices = {sym: last_prices.get(sym, start_price) for sym, start_price in zip(actual_symbols_processed, start_prices)}
 
 
             # Cache the results for subsequent /simulate calls
-            _cached_portfolio_data['symbols'] = actual_symbols_processed
-            _cached_portfolio_data['cov_matrix'] = cov_matrix_daily_np
-            _cached_portfolio_data['implied_returns'] = implied_eq_returns_daily
-            _cached_portfolio_data['P_matrix'] = P_matrix
-            _cached_portfolio_data['Q_vector'] = Q_vector
-            _cached_portfolio_data['Omega_matrix'] = Omega_matrix
-            _cached_portfolio_data['tauBL'] = request.tauBL
-            _cached_portfolio_data['riskAversionOpt'] = request.riskAversionOpt
-            _cached_portfolio_data['all_simulated_asset_paths'] = all_simulated_asset_paths_dict
-            _cached_portfolio_data['optimal_weights_dict'] = bl_optimal_weights
+            cache_entry = {
+                'symbols': actual_symbols_processed,
+                'params': _portfolio_params(request),
+                'cov_matrix': cov_matrix_daily_np,
+                'chol': cholesky_matrix,
+                'implied_returns': implied_eq_returns_daily,
+                'P_matrix': P_matrix,
+                'Q_vector': Q_vector,
+                'Omega_matrix': Omega_matrix,
+                'tauBL': request.tauBL,
+                'riskAversionOpt': request.riskAversionOpt,
+                # Parallel arrays indexed by 'symbols', so /simulate never walks dicts on the hot path
+                'mc_paths': mc_paths, # (N, T, I)
+                'symbol_index': {sym: i for i, sym in enumerate(actual_symbols_processed)},
+                'optimal_weights': bl_optimal_weights_np.ravel(),
+                'optimal_weights_dict': bl_optimal_weights,
+            }
 
             # Prepare response: Send only a sample of individual paths for frontend plotting
             # Ensure sample_individual_paths is always a dict, even if a stock had issues
             # Now sending the MEDIAN path (50th percentile) for better representativeness
-            sample_individual_paths = {
-                sym: np.median(paths, axis=1).tolist() # Changed to median path
-                for sym, paths in all_simulated_asset_paths_dict.items()
-                if paths.shape[0] > 0 and paths.shape[1] > 0 # Ensure paths are not empty
-            }
-
-            return InitializeDataResponse(
-                symbols=actual_symbols_processed, # Return the processed list
-                currentPrices=current_prices,
-                optimalWeights=bl_optimal_weights,
-                sampleIndividualPaths=sample_individual_paths
-            )
-
-        except ValueError as e: # Catch ValueErrors from your helper functions
-            print(f"Backend validation/data processing error during initialization: {e}")
-            raise HTTPException(status_code=400, detail=str(e))
-        except HTTPException as e: # Re-raise HTTPExceptions from Finnhub/Gemini/other parts
-            raise e
-        except Exception as e:
-            print(f"Backend internal error during initialization: {e}")
-            raise HTTPException(status_code=500, detail=f"An unexpected server error occurred during initialization: {e}")
+            sample_individual_paths = {}
+            if mc_paths.shape[1] > 0 and mc_paths.shape[2] > 0: # Ensure paths are not empty
+                # All symbols' median paths in one pass over the cube; the rows stay ndarrays (no .tolist())
+                sample_individual_paths = dict(zip(actual_symbols_processed, np.asarray(np.median(mc_paths, axis=2))))
+
+            # Same shape as InitializeDataResponse. Serialized once with orjson (numpy rows encoded natively) and
+            # cached as bytes, so repeat initializations of this portfolio skip serialization entirely
+            response = orjson.dumps({
+                "symbols": actual_symbols_processed, # Return the processed list
+                "currentPrices": current_prices,
+                "optimalWeights": bl_optimal_weights,
+                "sampleIndividualPaths": sample_individual_paths
+            }, option=orjson.OPT_SERIALIZE_NUMPY)
+            cache_entry['response'] = response
+            # /simulate is called with the processed symbols, which can be a subset of the requested ones
+            _store_cached_portfolio([cache_key, _portfolio_cache_key(actual_symbols_processed)], cache_entry)
+        except BaseException:
+            _remove_mc_paths_file(mc_paths)
+            raise
+        return Response(content=response, media_type="application/json")
+
+    except ValueError as e: # Catch ValueErrors from your helper functions
+        print(f"Backend validation/data processing error during initialization: {e}")
+        raise HTTPException(status_code=400, detail=str(e))
+    except HTTPException as e: # Re-raise HTTPExceptions from Finnhub/Gemini/other parts
+        raise e
+    except Exception as e:
+        print(f"Backend internal error during initialization: {e}")
+        raise HTTPException(status_code=500, detail=f"An unexpected server error occurred during initialization: {e}")
 
 @app.post("/api/portfolio/simulate", response_model=SimulatePortfolioResponse)
 async def simulate_portfolio(request: UserWeightsRequest):
@@ -795,66 +1107,60 @@ async def simulate_portfolio(request: UserWeightsRequest):
     Simulates a portfolio based on user-provided weights and returns its forecast data and stats.
     Uses cached data from /api/portfolio/initialize-data.
     """
-    if not _cached_portfolio_data:
-        raise HTTPException(status_code=400, detail="Portfolio data not initialized. Call /api/portfolio/initialize-data first.")
+    cached_entry = _get_cached_portfolio(_portfolio_cache_key(request.symbols))
+    if cached_entry is None:
+        raise HTTPException(status_code=400, detail="Portfolio data not initialized for these symbols. Call /api/portfolio/initialize-data first.")
+    conflicting_params = _conflicting_params(cached_entry['params'], request)
+    if conflicting_params:
+        raise HTTPException(status_code=400, detail=f"Portfolio data for these symbols was initialized with different {', '.join(conflicting_params)}. Call /api/portfolio/initialize-data again with the new parameters.")
 
     # Retrieve cached data
-    actual_symbols_processed = _cached_portfolio_data['symbols']
-    all_simulated_asset_paths_dict = _cached_portfolio_data['all_simulated_asset_paths']
-    optimal_weights_dict = _cached_portfolio_data['optimal_weights_dict']
+    actual_symbols_processed = cached_entry['symbols']
+    mc_paths = cached_entry['mc_paths']
+    optimal_weights_dict = cached_entry['optimal_weights_dict']
     
-    # Ensure request symbols match cached symbols, and weights are ordered correctly
-    if set(request.symbols) != set(actual_symbols_processed):
-        raise HTTPException(status_code=400, detail="Symbols in request do not match initialized symbols. Please re-initialize data.")
-    
-    user_weights_np = np.array([request.weights.get(sym, 0.0) for sym in actual_symbols_processed]).reshape(-1, 1)
+    # Scatter the submitted weights into a zeroed array: O(len(weights)), and symbols without a weight stay 0
+    symbol_index = cached_entry['symbol_index']
+    user_weights_np = np.zeros(len(actual_symbols_processed), dtype=np.float64)
+    for sym, weight in request.weights.items():
+        i = symbol_index.get(sym)
+        if i is not None:
+            user_weights_np[i] = weight
 
     try:
         # Simulate portfolio value with user's weights
-        simulated_portfolio_values = simulate_portfolio_value(
+        simulated_portfolio_values = simulate_portfolio_value_from_array(
             initial_portfolio_value=request.initialPortfolioValue,
-            optimal_weights=user_weights_np,
-            simulated_asset_paths=all_simulated_asset_paths_dict
+            weights=user_weights_np,
+            asset_paths=mc_paths
         )
 
         # --- Calculate Portfolio Stats ---
-        final_portfolio_values = simulated_portfolio_values[-1, :]
-        initial_value_for_stats = simulated_portfolio_values[0, 0] # Should be initialPortfolioValue
-
-        # DEBUG PRINTS FOR STATS CALCULATION:
-        print(f"\n--- DEBUG STATS CALCULATION ---")
-        print(f"Current time: {datetime.now()}")
-        print(f"Shape of simulated_portfolio_values: {simulated_portfolio_values.shape}")
-        print(f"Initial Value for Stats: {initial_value_for_stats}")
-        print(f"Sample final_portfolio_values (first 5): {final_portfolio_values[:5]}")
-        print(f"Min final_portfolio_values: {np.min(final_portfolio_values)}")
-        print(f"Max final_portfolio_values: {np.max(final_portfolio_values)}")
-        print(f"Range of final_portfolio_values: {np.max(final_portfolio_values) - np.min(final_portfolio_values)}")
-
-
-        expected_return = (np.mean(final_portfolio_values) - initial_value_for_stats) / initial_value_for_stats
-        expected_return_annualized = (1 + expected_return)**(252/request.numTimeIntervals) - 1 if request.numTimeIntervals > 0 else expected_return
-
-        annualized_returns_per_path = (final_portfolio_values / initial_value_for_stats)**(252/request.numTimeIntervals) - 1
-        
-        print(f"Sample annualized_returns_per_path (first 5): {annualized_returns_per_path[:5]}")
-        print(f"Min annualized_returns_per_path: {np.min(annualized_returns_per_path)}")
-        print(f"Max annualized_returns_per_path: {np.max(annualized_returns_per_path)}")
-        print(f"Range of annualized_returns_per_path: {np.max(annualized_returns_per_path) - np.min(annualized_returns_per_path)}")
-        print(f"Standard deviation of annualized_returns_per_path: {np.std(annualized_returns_per_path)}")
-        
-        standard_deviation_annualized = np.std(annualized_returns_per_path)
+        # Views into the (T, I) array, taken once and shared by the stats, debug output and response
+        final_portfolio_values = simulated_portfolio_values[-1]
+        initial_value_for_stats = float(simulated_portfolio_values[0, 0]) # Should be initialPortfolioValue
+
+        # Stats diagnostics cost extra reductions over every path, so only compute them when DEBUG logging is on
+        if log.isEnabledFor(logging.DEBUG):
+            final_min, final_max = np.min(final_portfolio_values), np.max(final_portfolio_values)
+            log.debug("Simulation stats: values shape %s, initial value %s, final values min %s max %s range %s",
+                      simulated_portfolio_values.shape, initial_value_for_stats, final_min, final_max, final_max - final_min)
+
+        # Annualization exponent computed once and shared by every stat below
+        # Horizon of the cached paths (numTimeIntervals > 0 was enforced when the portfolio was initialized)
+        annualization_exponent = 252 / cached_entry['params']['numTimeIntervals']
+        # Mean path, mean final value, std of annualized per-path returns and max drawdown in one fused pass
+        mean_portfolio_path, mean_final_value, standard_deviation_annualized, max_drawdown = \
+            portfolio_path_stats(simulated_portfolio_values, annualization_exponent)
+
+        expected_return = (mean_final_value - initial_value_for_stats) / initial_value_for_stats
+        expected_return_annualized = (1 + expected_return)**annualization_exponent - 1
 
         # Sharpe Ratio (Requires risk-free rate - assuming 0.02 for simplicity, or provide as input)
         risk_free_rate = 0.02 # Example annual risk-free rate, adjust as needed
         sharpe_ratio = (expected_return_annualized - risk_free_rate) / standard_deviation_annualized if standard_deviation_annualized != 0 else 0.0
 
-        # Max Drawdown (computed from average path for simplicity on frontend)
-        cumulative_returns_avg_path = simulated_portfolio_values.mean(axis=1) / initial_value_for_stats
-        peak = np.maximum.accumulate(cumulative_returns_avg_path)
-        drawdown = (peak - cumulative_returns_avg_path) / peak
-        max_drawdown = np.max(drawdown)
-
+        # Max Drawdown is computed from the average path above (for simplicity on frontend)
 
         # Risk Category (Heuristic based on annualized standard deviation)
         if standard_deviation_annualized < 0.08: # < 8% annualized volatility
@@ -864,18 +1170,20 @@ async def simulate_portfolio(request: UserWeightsRequest):
         else: # > 15%
             risk_category = 'Aggressive'
 
-        return SimulatePortfolioResponse(
-            simulatedPortfolioValues=np.mean(simulated_portfolio_values, axis=1).tolist(), # Average path for charting
-            simulatedPortfolioFinalValues=final_portfolio_values.tolist(), # All final values for frontend stats (VaR)
-            portfolioStats=PortfolioStatsResponse( # Return as a Pydantic model
-                expectedReturn=expected_return_annualized,
-                standardDeviation=standard_deviation_annualized,
-                sharpeRatio=sharpe_ratio,
-                maxDrawdown=max_drawdown,
-                riskCategory=risk_category,
-                optimalWeights=optimal_weights_dict # Pass the pre-calculated optimal weights
-            )
-        )
+        # Same shape as SimulatePortfolioResponse, but the arrays go straight to orjson (which serializes numpy
+        # buffers natively) instead of through .tolist() and per-element pydantic validation
+        return ORJSONResponse(content={
+            "simulatedPortfolioValues": mean_portfolio_path, # Average path for charting
+            "simulatedPortfolioFinalValues": final_portfolio_values, # All final values for frontend stats (VaR)
+            "portfolioStats": {
+                "expectedReturn": float(expected_return_annualized),
+                "standardDeviation": standard_deviation_annualized,
+                "sharpeRatio": float(sharpe_ratio),
+                "maxDrawdown": max_drawdown,
+                "riskCategory": risk_category,
+                "optimalWeights": optimal_weights_dict # Pass the pre-calculated optimal weights
+            }
+        })
 
     except ValueError as e:
         print(f"Backend validation/data processing error during simulation: {e}")
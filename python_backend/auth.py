@@ -1,50 +1,261 @@
 import json
 import hashlib
+import hmac
 import os
+import threading
 
 USER_DB = 'users.json'
+# Registrations are appended here as one JSON record per line instead of rewriting all of users.json.
+# Every full rewrite of users.json (watchlist flushes, save_users) folds these records in and trims the log.
+USER_LOG = 'users.jsonl'
+
+def _read_user_log():
+    """Returns the user records appended to USER_LOG, skipping a torn (half-written) last line."""
+    records = []
+    try:
+        with open(USER_LOG, 'r') as f:
+            for line in f:
+                try:
+                    records.append(json.loads(line))
+                except json.JSONDecodeError:
+                    continue
+    except FileNotFoundError:
+        pass
+    return records
 
 def load_users():
-    """Loads user data from the JSON file."""
+    """
+    Loads user data from the JSON file, plus any registrations still only in the append log.
+    Log records only add emails missing from users.json: the snapshot is always the newer copy of a user
+    it already contains (the log can outlive a rewrite if the process dies before trimming it).
+    """
     try:
         with open(USER_DB, 'r') as f:
-            return json.load(f)
+            users = json.load(f)
     except FileNotFoundError:
-        return []
+        users = []
     except json.JSONDecodeError: # Added to handle empty/malformed JSON files
-        return []
+        users = []
+
+    log_records = _read_user_log()
+    if log_records:
+        known_emails = {user["email"] for user in users}
+        new_users = {record["email"]: record for record in log_records if record["email"] not in known_emails}
+        users.extend(new_users.values())
+    return users
+
+def _storage_signature():
+    """(users.json mtime, users.jsonl mtime), with None for a missing file; changes whenever either file does."""
+    signature = []
+    for path in (USER_DB, USER_LOG):
+        try:
+            signature.append(os.stat(path).st_mtime_ns)
+        except FileNotFoundError:
+            signature.append(None)
+    return tuple(signature)
+
+# Parsed users (snapshot + log) and the storage signature they were read at; re-parsed only when a file changes.
+# "index" holds O(1) lookup tables built from "data" (see _build_users_index).
+_users_cache = {"mtime": -1, "data": None, "index": None, "writing": False} # mtime -1 = never loaded
+# Serializes register_user's check-then-append so two registrations can't both pass the duplicate check
+_register_lock = threading.Lock()
+# Guards USER_LOG between appends and the trim that follows a users.json rewrite (which may run on a worker thread)
+_log_lock = threading.Lock()
+
+def _build_users_index(users):
+    """Builds {email: user} and {email: set of watchlist symbols} lookup tables for the given user list."""
+    return {
+        "by_email": {user["email"]: user for user in users},
+        "symbols_by_email": {user["email"]: {item["symbol"] for item in user.get("watchlist", [])} for user in users},
+    }
+
+def _refresh_users_cache():
+    """Re-reads users.json into the cache if it changed on disk since the last read."""
+    if _users_cache["writing"]:
+        return # The in-memory list is newer than anything a half-finished write put on disk
+    signature = _storage_signature()
+    if signature != _users_cache["mtime"]:
+        users = load_users()
+        _users_cache.update(mtime=signature, data=users, index=_build_users_index(users))
+
+def load_users_cached():
+    """
+    Returns the user list, re-reading users.json only when its modification time has changed.
+    Callers that mutate the returned list must persist it with save_users().
+    """
+    _refresh_users_cache()
+    return _users_cache["data"]
+
+def get_users_index():
+    """
+    Returns {"by_email": {email: user}, "symbols_by_email": {email: set(symbols)}} for the cached user list.
+    The user dicts are the same objects as in load_users_cached(), so mutations persist via save_users().
+    """
+    _refresh_users_cache()
+    return _users_cache["index"]
+
+def update_users_cache(users):
+    """
+    Records an in-memory change to the user list without writing it to disk (the caller schedules the save).
+    Rebuilds the lookup index so reads see the change immediately.
+    """
+    _users_cache.update(data=users, index=_build_users_index(users))
+
+def user_log_size():
+    """Current size of USER_LOG in bytes. Take it when serializing a snapshot and pass it to write_users_file()."""
+    try:
+        return os.path.getsize(USER_LOG)
+    except FileNotFoundError:
+        return 0
+
+def append_user_record(user):
+    """Durably appends one user record to USER_LOG; O(1) no matter how many users exist."""
+    with _log_lock:
+        with open(USER_LOG, 'a') as f:
+            f.write(json.dumps(user) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+
+def _trim_user_log(log_offset):
+    """Drops the first log_offset bytes of USER_LOG (records already folded into users.json)."""
+    with _log_lock:
+        try:
+            with open(USER_LOG, 'r') as f:
+                f.seek(log_offset)
+                remaining = f.read()
+        except FileNotFoundError:
+            return
+        if not remaining:
+            os.remove(USER_LOG)
+            return
+        # Registrations that arrived after the snapshot was taken stay in the log
+        tmp_path = f"{USER_LOG}.tmp"
+        with open(tmp_path, 'w') as f:
+            f.write(remaining)
+        os.replace(tmp_path, USER_LOG)
+
+def write_users_file(payload, log_offset):
+    """
+    Atomically replaces users.json with an already-serialized JSON payload, then trims the log records
+    it now contains. log_offset is user_log_size() taken when the payload was serialized.
+    Touches no shared cache state, so it is safe to run on a worker thread.
+    """
+    # Write to a temp file and swap it in, so a crash mid-write never leaves a truncated users.json
+    tmp_path = f"{USER_DB}.tmp"
+    with open(tmp_path, 'w') as f:
+        f.write(payload)
+    os.replace(tmp_path, USER_DB)
+    _trim_user_log(log_offset)
+
+def begin_users_write():
+    """Marks a background write_users_file() as in flight so the cache is not re-read from disk meanwhile."""
+    _users_cache["writing"] = True
+
+def finish_users_write(written=False):
+    """
+    Ends a background write. Pass written=True on success so the cache doesn't re-read what it just wrote.
+    """
+    _users_cache["writing"] = False
+    if written:
+        _users_cache["mtime"] = _storage_signature()
 
 def save_users(users):
     """Saves user data to the JSON file."""
-    with open(USER_DB, 'w') as f:
-        json.dump(users, f, indent=2)
+    write_users_file(json.dumps(users, indent=2), user_log_size())
+    # Keep the cache in step with what we just wrote so the next read doesn't re-parse the file
+    _users_cache.update(mtime=_storage_signature(), data=users, index=_build_users_index(users))
+
+# scrypt cost parameters for stored password hashes (~16 MB of memory per hash, a few ms on a modern CPU)
+SCRYPT_N = 2 ** 14
+SCRYPT_R = 8
+SCRYPT_P = 1
+SCRYPT_DKLEN = 32
 
-def hash_password(password):
-    """Hashes the password using SHA256."""
+def hash_password(password, salt=None):
+    """
+    Hashes the password with salted scrypt. A fresh random 16-byte salt is generated unless one is given.
+    Returns (salt_hex, hash_hex).
+    """
+    if salt is None:
+        salt = os.urandom(16)
+    pwhash = hashlib.scrypt(password.encode(), salt=salt, n=SCRYPT_N, r=SCRYPT_R, p=SCRYPT_P, dklen=SCRYPT_DKLEN)
+    return salt.hex(), pwhash.hex()
+
+def _legacy_hash_password(password):
+    """Unsalted SHA256 used by accounts created before scrypt; only checked so those users can still log in."""
     return hashlib.sha256(password.encode()).hexdigest()
 
-def register_user(email, password):
+def check_password(user, password):
+    """
+    Checks a password against a stored user record in constant time without modifying the record,
+    so the slow hashing can run on a worker thread.
+    Returns (matches, upgrade): upgrade is a new scrypt (salt, pwhash) when a legacy SHA256 record matched.
+    """
+    if "pwhash" in user:
+        _, pwhash = hash_password(password, bytes.fromhex(user["salt"]))
+        return hmac.compare_digest(user["pwhash"], pwhash), None
+
+    if "password" in user and hmac.compare_digest(user["password"], _legacy_hash_password(password)):
+        return True, hash_password(password)
+    return False, None
+
+def apply_password_upgrade(user, upgrade):
+    """
+    Replaces a legacy SHA256 record with the scrypt upgrade from check_password(); the upgrade is written out
+    with the next save of the user list. A no-op if the record was already upgraded (e.g. by a concurrent login).
+    """
+    if upgrade is not None and "password" in user:
+        user["salt"], user["pwhash"] = upgrade
+        del user["password"]
+
+def verify_password(user, password):
+    """
+    Checks a password against a stored user record in constant time.
+    Legacy SHA256 records are upgraded in place to scrypt on a successful check.
+    """
+    matches, upgrade = check_password(user, password)
+    if matches:
+        apply_password_upgrade(user, upgrade)
+    return matches
+
+def register_user(email, password, credentials=None):
     """
     Registers a new user, hashes their password, and stores credentials in users.json.
     Initializes an empty watchlist for the new user.
+    credentials is an optional precomputed hash_password(password) result, so callers can hash off-thread
+    and keep the user cache and log updates on their own thread.
     """
-    users = load_users()
-    if any(user["email"] == email for user in users):
-        return {"success": False, "message": "User already exists"}
-    
-    # Store user as a dictionary with an empty watchlist (new for watch list feature)
-    users.append({"email": email, "password": hash_password(password), "watchlist": []})
-    save_users(users)
-    print(f"User registered and saved to {USER_DB}: {email}")
+    with _register_lock:
+        # Use the cached list so changes still waiting on a debounced save are not overwritten
+        users = load_users_cached()
+        if email in get_users_index()["by_email"]:
+            return {"success": False, "message": "User already exists"}
+
+        # Store user as a dictionary with an empty watchlist (new for watch list feature)
+        salt, pwhash = credentials if credentials is not None else hash_password(password)
+        user = {"email": email, "salt": salt, "pwhash": pwhash, "watchlist": []}
+        append_user_record(user)
+
+        # Add the user to the cached list and index directly instead of re-reading or rebuilding them
+        users.append(user)
+        index = _users_cache["index"]
+        index["by_email"][email] = user
+        index["symbols_by_email"][email] = set()
+        if not _users_cache["writing"]:
+            _users_cache["mtime"] = _storage_signature()
+    print(f"User registered and saved to {USER_LOG}: {email}")
     return {"success": True, "message": "Registration successful"}
 
+def login_result(email, matches):
+    """The login_user() response for a finished password check."""
+    if matches:
+        print(f"User logged in: {email}")
+        return {"success": True, "message": "Login successful"}
+    return {"success": False, "message": "Invalid credentials"}
+
 def login_user(email, password):
     """
     Authenticates a user by checking credentials against users.json using hashed passwords.
     """
-    users = load_users()
-    for user in users:
-        if user["email"] == email and user["password"] == hash_password(password):
-            print(f"User logged in: {email}")
-            return {"success": True, "message": "Login successful"}
-    return {"success": False, "message": "Invalid credentials"}
+    user = get_users_index()["by_email"].get(email)
+    return login_result(email, user is not None and verify_password(user, password))
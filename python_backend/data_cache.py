@@ -0,0 +1,187 @@
+import os
+import time
+import pickle
+import hashlib
+import shutil
+import tempfile
+import threading
+from collections import OrderedDict
+from datetime import date
+from typing import Any, Dict, List, Tuple
+
+import numpy as np
+import pandas as pd
+import yfinance as yf
+
+# Directory where cached yfinance responses are pickled between runs
+CACHE_DIR = '.cache'
+
+# Time-to-live (in seconds) for each kind of cached data
+PRICE_CACHE_TTL = 24 * 60 * 60      # Daily prices only change once per trading day
+MARKET_CAP_CACHE_TTL = 12 * 60 * 60 # Market caps drift slowly; half a day is fresh enough
+HISTORY_CACHE_TTL = 5 * 60           # Ticker.history backs live views, so only absorb bursts of reloads
+HISTORY_CACHE_MAX_ENTRIES = 512
+
+
+def _cache_path(key: str) -> str:
+    """Maps a cache key to a file path inside CACHE_DIR."""
+    digest = hashlib.md5(key.encode()).hexdigest()
+    return os.path.join(CACHE_DIR, f"{digest}.pkl")
+
+def load_cached(key: str, ttl: float) -> Any:
+    """
+    Returns the value stored under `key` if it exists and is younger than `ttl` seconds.
+    Returns None on a cache miss, an expired entry, or an unreadable file.
+    """
+    try:
+        with open(_cache_path(key), 'rb') as f:
+            saved_at, value = pickle.load(f)
+    except (FileNotFoundError, pickle.UnpicklingError, EOFError, ValueError):
+        return None
+    if time.time() - saved_at > ttl:
+        return None
+    return value
+
+def save_cached(key: str, value: Any) -> None:
+    """Pickles `value` under `key` together with the current timestamp."""
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    path = _cache_path(key)
+    try:
+        # Write to a private temp file and swap it in, so a reader (or a concurrent request caching the same
+        # download) never sees a half-written pickle
+        fd, tmp_path = tempfile.mkstemp(suffix='.tmp', dir=CACHE_DIR)
+        with os.fdopen(fd, 'wb') as f:
+            pickle.dump((time.time(), value), f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)
+    except OSError as e:
+        print(f"Warning: Could not write cache entry for '{key}': {e}")
+
+def clear_cache() -> None:
+    """Deletes every cached entry."""
+    shutil.rmtree(CACHE_DIR, ignore_errors=True)
+
+
+def download_prices(symbols: List[str], period: str):
+    """
+    Cached wrapper around yf.download for multi-symbol price history.
+    Keyed by the (sorted) symbols and period so repeated runs skip the network entirely.
+    """
+    key = f"prices|{sorted(symbols)}|{period}"
+    data = load_cached(key, PRICE_CACHE_TTL)
+    if data is not None:
+        return data
+
+    # Use group_by='ticker' for multi-symbol downloads to get MultiIndex columns
+    # auto_adjust=True uses Adjusted Close, which is generally preferred.
+    # actions/progress are off: we never use dividends/splits and the progress bar is pure overhead.
+    # threads=True fetches all tickers concurrently in one call instead of one round-trip per symbol.
+    data = yf.download(symbols, period=period, group_by='ticker', auto_adjust=True, actions=False,
+                       threads=True, progress=False)
+
+    # Only the close columns are ever read, so drop Open/High/Low/Volume before caching/extracting
+    close_fields = ['Adj Close', 'Close']
+    if isinstance(data.columns, pd.MultiIndex):
+        data = data.loc[:, data.columns.get_level_values(1).isin(close_fields)]
+    else:
+        data = data[[col for col in close_fields if col in data.columns]]
+
+    if not data.empty: # Never cache a failed download
+        save_cached(key, data)
+    return data
+
+
+def extract_close_prices(data, symbols: List[str]) -> Tuple[np.ndarray, List[str]]:
+    """
+    Pulls one close-price column per symbol out of a yf.download result.
+    Prefers 'Adj Close' and falls back to 'Close'; symbols with no usable column are skipped.
+
+    Returns:
+        A tuple: (prices array of shape (T, len(successful_symbols)), successful_symbols)
+        Rows still contain NaNs where a symbol has no quote for that date.
+    """
+    is_multi_symbol = isinstance(data.columns, pd.MultiIndex) # Flat columns for a single-symbol download
+    available_columns = set(data.columns) if len(data.index) else set() # No rows means no usable column
+    selected_columns = []
+    successful_symbols = []
+
+    # Pick each symbol's column label first (cheap), then pull every selected column out of the frame in
+    # a single to_numpy() block copy instead of converting and stacking one column at a time
+    for sym in symbols:
+        if is_multi_symbol:
+            candidates = [(sym, 'Adj Close'), (sym, 'Close')] # Fallback to 'Close'
+        else:
+            candidates = ['Adj Close', 'Close']
+
+        column = next((col for col in candidates if col in available_columns), None)
+        if column is None:
+            print(f"WARNING: Skipping '{sym}' due to missing or empty data: no valid 'Adj Close' or 'Close' column.")
+            continue # Allow other symbols to be processed
+
+        selected_columns.append(column)
+        successful_symbols.append(sym)
+
+    if not selected_columns:
+        return np.empty((0, 0)), successful_symbols
+    return data[selected_columns].to_numpy(dtype=np.float64), successful_symbols
+
+
+# {(frozenset(symbols), day): {sym: last close}} so asking for the same symbols again that day skips yfinance
+_last_prices_cache: Dict[tuple, Dict[str, float]] = {}
+_last_prices_cache_lock = threading.Lock() # Callers run this on worker threads (asyncio.to_thread)
+
+def fetch_last_prices(symbols: List[str]) -> Dict[str, float]:
+    """
+    Last close for each symbol from one batched 1-day yf.download (blocking).
+    Symbols yfinance returns nothing for are left out so the caller can apply its own fallback.
+    """
+    today = date.today()
+    cache_key = (frozenset(symbols), today)
+    with _last_prices_cache_lock:
+        cached = _last_prices_cache.get(cache_key)
+    if cached is not None:
+        return cached
+
+    # Fetching 1-day history is fast for just the last price; all tickers go in one request
+    hist_data = yf.download(symbols, period='1d', auto_adjust=True, progress=False, group_by='ticker', threads=True)
+    prices, found_symbols = extract_close_prices(hist_data, symbols)
+
+    last_prices = {}
+    for i, sym in enumerate(found_symbols):
+        column = prices[:, i]
+        column = column[~np.isnan(column)]
+        if column.size:
+            last_prices[sym] = float(column[-1])
+
+    if last_prices: # Never cache a failed download
+        with _last_prices_cache_lock:
+            for stale_key in [key for key in _last_prices_cache if key[1] != today]:
+                del _last_prices_cache[stale_key]
+            _last_prices_cache[cache_key] = last_prices
+    return last_prices
+
+# In-memory {(SYMBOL, period): (fetched_at, DataFrame)} LRU for Ticker.history. Kept out of the disk cache:
+# entries live minutes, not days. Callers may run on worker threads, so access goes through a lock.
+_history_cache: "OrderedDict[Tuple[str, str], tuple]" = OrderedDict()
+_history_cache_lock = threading.Lock()
+
+def ticker_history(symbol: str, period: str) -> pd.DataFrame:
+    """
+    Cached wrapper around yf.Ticker(symbol).history(period=period) (auto-adjusted, as yfinance defaults to).
+    Repeated calls within HISTORY_CACHE_TTL return the same DataFrame, so callers must not modify it in place.
+    """
+    key = (symbol.upper(), period)
+    with _history_cache_lock:
+        cached = _history_cache.get(key)
+        if cached and time.monotonic() - cached[0] < HISTORY_CACHE_TTL:
+            _history_cache.move_to_end(key)
+            return cached[1]
+
+    data = yf.Ticker(key[0]).history(period=period)
+
+    if not data.empty: # Never cache a failed download
+        with _history_cache_lock:
+            _history_cache[key] = (time.monotonic(), data)
+            _history_cache.move_to_end(key)
+            if len(_history_cache) > HISTORY_CACHE_MAX_ENTRIES:
+                _history_cache.popitem(last=False)
+    return data
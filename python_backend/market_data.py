@@ -1,22 +1,12 @@
-import yfinance as yf
+from data_cache import ticker_history
 #We use colon as a typehint
 def get_index_data(symbol: str, period: str = "1y"):
-    index = yf.Ticker(symbol)
-    data = index.history(period = period)
-    data = data.reset_index()
-    result = []
+    #Served from a short-lived in-memory cache so frequent dashboard reloads don't each hit yfinance
+    close = ticker_history(symbol, period)["Close"]
     #This converion is required because Fast API cant handle numpy int 64 and datetime 64.
     #Hence conversion is required to be stored in a JSON file as key value pairs
-    for row in data[["Date", "Close"]].to_dict(orient="records"):
-        #hasattr is used to determine if the object has an attribute function, in this case strftime
-        #If it does have this formatting option, it means its a pandas specific timestamp
-        #Meaning we have to format it, so use strftime
-        #now u want your close value to be formatted into a float and not int64 on pandas 
-        result.append({
-            "Date": row["Date"].strftime("%Y-%m-%d") if hasattr(row["Date"], "strftime") else str(row["Date"]),
-            "Close": float(row["Close"])
-        })
-    
-    return result
-
-
+    #Format the whole date index in one vectorized strftime and turn the closes into python floats in one
+    #tolist() call, instead of building a reset_index frame and converting it row by row
+    dates = close.index.strftime("%Y-%m-%d").tolist()
+    closes = close.to_numpy(dtype=float).tolist()
+    return [{"Date": d, "Close": c} for d, c in zip(dates, closes)]
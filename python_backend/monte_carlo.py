@@ -1,22 +1,282 @@
-import yfinance as yf
+import os
+import threading
+import contextlib
+import importlib
 import numpy as np
-import pandas as pd
-from scipy.stats import norm
-from typing import List, Dict, Union
+from numpy.random import Generator, Philox, SeedSequence
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional, Tuple
+
+from data_cache import download_prices, extract_close_prices
+
+# numba is optional: when it's installed the path generation and stats kernels below are compiled to
+# native code, otherwise the same math is done with whole-array NumPy operations.
+# The kernels release the GIL (nogil=True), so simulations started from different threads (e.g. concurrent
+# API requests) run side by side when numba has a thread-safe threading layer (see _parallel_kernel_guard).
+try:
+    from numba import njit, prange, config as numba_config
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+
+def _threadsafe_layer_available() -> bool:
+    """True if numba can load a threading layer (TBB or OpenMP) that allows concurrent parallel launches."""
+    for pool_module in ('numba.np.ufunc.tbbpool', 'numba.np.ufunc.omppool'):
+        try:
+            importlib.import_module(pool_module)
+            return True
+        except ImportError:
+            continue
+    return False
+
+# The parallel kernels are entered from several threads at once (the API builds paths on a worker thread while
+# /simulate runs the value/stats kernels on the event loop). numba's fallback workqueue layer aborts the process
+# on concurrent use, so ask for a thread-safe layer when one is installed (before anything is compiled) and
+# otherwise serialize kernel calls behind a lock. An explicit NUMBA_THREADING_LAYER is respected but locked.
+if NUMBA_AVAILABLE and 'NUMBA_THREADING_LAYER' not in os.environ and _threadsafe_layer_available():
+    numba_config.THREADING_LAYER = 'threadsafe'
+    _parallel_kernel_guard = contextlib.nullcontext()
+elif NUMBA_AVAILABLE:
+    _parallel_kernel_guard = threading.Lock()
+else:
+    _parallel_kernel_guard = contextlib.nullcontext() # NumPy fallbacks are safe to run concurrently
 
 # Define as a global constant for the module
 # This factor multiplies the volatility component in the GBM simulation.
 # Use 1.0 for standard behavior. Increase (e.g., 5.0, 10.0, 20.0) for diagnostic purposes if variance is too low.
 VOLATILITY_MAGNIFICATION_FACTOR_GLOBAL = 1.0 # <--- SET THIS TO 10.0 FOR DIAGNOSIS. Change to 1.0 for production if it works.
 
+# Set to True to print the Monte Carlo inputs (mean log returns, variances, drift) on every call.
+DEBUG_MC = False
+
+# Shock generation uses one independent Philox stream per block of this many paths. The block size (not the
+# thread count) fixes which stream feeds which path, so seeded runs repeat exactly on any machine.
+MC_RNG_BLOCK_PATHS = 256
+# Blocks are drawn on this many worker threads; NumPy's Generator releases the GIL while filling arrays.
+MC_RNG_WORKERS = min(4, os.cpu_count() or 1)
+
+
+if NUMBA_AVAILABLE:
+    @njit(cache=True, fastmath=True, parallel=True, nogil=True)
+    def _correlated_gbm_paths(S0_vector, drift_vector, scaled_cholesky, independent_shocks):
+        """
+        Builds (num_assets, steps + 1, iteration) correlated GBM price paths in one fused pass:
+        for every path and step, correlate the shocks (lower-triangular scaled_cholesky @ z), add the drift,
+        exponentiate and compound. Paths are independent, so they are spread across threads, and no
+        (num_assets, iteration, steps) intermediate is ever materialized.
+        """
+        num_assets, iteration, steps = independent_shocks.shape
+        paths = np.empty((num_assets, steps + 1, iteration), dtype=independent_shocks.dtype)
+        # prange hands each thread a contiguous run of paths, so a thread's writes to a time row stay together
+        for k in prange(iteration):
+            # Asset a only needs shocks j <= a, so each asset's whole path can be built in turn with the
+            # running price in a register
+            for a in range(num_assets):
+                price = S0_vector[a]
+                paths[a, 0, k] = price
+                for t in range(steps):
+                    shock = 0.0
+                    for j in range(a + 1):
+                        shock += scaled_cholesky[a, j] * independent_shocks[j, k, t]
+                    price *= np.exp(drift_vector[a] + shock)
+                    paths[a, t + 1, k] = price
+        return paths
+else:
+    def _correlated_gbm_paths(S0_vector, drift_vector, scaled_cholesky, independent_shocks):
+        """NumPy fallback for the compiled kernel: paths are built in log space and exponentiated once."""
+        num_assets, iteration, steps = independent_shocks.shape
+        # log S_t = log S0 + sum of (drift + L z) over the first t steps. Folding log S0 into the first step
+        # lets one cumsum produce log prices directly, leaving a single exp over the output
+        # L @ z for every path as one batched BLAS matmul over the iteration-major shock buffer (einsum here
+        # doesn't dispatch to BLAS), then one copy into (num_assets, steps, iteration) so the cumsum adds whole
+        # contiguous time rows
+        per_path_shocks = np.matmul(scaled_cholesky, independent_shocks.transpose(1, 0, 2))
+        log_returns = np.ascontiguousarray(per_path_shocks.transpose(1, 2, 0))
+        del per_path_shocks
+        log_returns += drift_vector[:, np.newaxis, np.newaxis]
+        with np.errstate(divide='ignore'): # A zero start price gives log 0 = -inf, i.e. a path stuck at 0
+            log_returns[:, :1, :] += np.log(S0_vector)[:, np.newaxis, np.newaxis]
+        paths = np.empty((num_assets, steps + 1, iteration), dtype=independent_shocks.dtype)
+        paths[:, 0, :] = S0_vector[:, np.newaxis]
+        np.cumsum(log_returns, axis=1, out=paths[:, 1:, :])
+        np.exp(paths[:, 1:, :], out=paths[:, 1:, :])
+        return paths
+
+if NUMBA_AVAILABLE:
+    @njit(cache=True, fastmath=True, parallel=True, nogil=True)
+    def _portfolio_stats_kernel(portfolio_values, initial_value, annualization_exponent):
+        time_intervals, num_iterations = portfolio_values.shape
+        # Mean path: rows are contiguous, so each row is one sequential sweep
+        mean_path = np.empty(time_intervals)
+        for t in prange(time_intervals):
+            row_sum = 0.0
+            for i in range(num_iterations):
+                row_sum += portfolio_values[t, i]
+            mean_path[t] = row_sum / num_iterations
+
+        # Std of annualized per-path returns from the last row (the mean final value is already mean_path[-1])
+        return_sum = 0.0
+        for i in prange(num_iterations):
+            return_sum += (portfolio_values[time_intervals - 1, i] / initial_value) ** annualization_exponent - 1.0
+        mean_return = return_sum / num_iterations
+        squared_deviation_sum = 0.0
+        for i in prange(num_iterations):
+            deviation = (portfolio_values[time_intervals - 1, i] / initial_value) ** annualization_exponent - 1.0 - mean_return
+            squared_deviation_sum += deviation * deviation
+
+        # Max drawdown of the mean path with a running peak
+        peak = mean_path[0]
+        max_drawdown = 0.0
+        for t in range(time_intervals):
+            if mean_path[t] > peak:
+                peak = mean_path[t]
+            drawdown = (peak - mean_path[t]) / peak
+            if drawdown > max_drawdown:
+                max_drawdown = drawdown
+        return mean_path, mean_path[time_intervals - 1], np.sqrt(squared_deviation_sum / num_iterations), max_drawdown
+else:
+    def _portfolio_stats_kernel(portfolio_values, initial_value, annualization_exponent):
+        mean_path = portfolio_values.mean(axis=1)
+        final_values = portfolio_values[-1]
+        annualized_returns_per_path = (final_values / initial_value) ** annualization_exponent - 1
+        peak = np.maximum.accumulate(mean_path)
+        max_drawdown = np.max((peak - mean_path) / peak)
+        return mean_path, mean_path[-1], annualized_returns_per_path.std(), max_drawdown
+
+if NUMBA_AVAILABLE:
+    @njit(cache=True, fastmath=True, parallel=True, nogil=True)
+    def _portfolio_values_kernel(num_shares, asset_paths):
+        num_assets, time_intervals, num_iterations = asset_paths.shape
+        portfolio_values = np.zeros((time_intervals, num_iterations))
+        # One time step per thread; each asset's row for that step is a contiguous run of iterations,
+        # accumulated straight into the float64 output whatever dtype the paths are stored in
+        for t in prange(time_intervals):
+            for n in range(num_assets):
+                shares = num_shares[n]
+                for i in range(num_iterations):
+                    portfolio_values[t, i] += shares * asset_paths[n, t, i]
+        return portfolio_values
+else:
+    def _portfolio_values_kernel(num_shares, asset_paths):
+        # Buy-and-hold value is a share-weighted sum over assets: one contraction instead of a per-path loop.
+        # tensordot flattens the (N, T, I) cube to (N, T*I) and hands it to BLAS as a single GEMV.
+        # The (T, I) result is small next to the paths, so hand it back in float64 for the stats downstream
+        return np.tensordot(num_shares, asset_paths, axes=(0, 0)).astype(np.float64, copy=False)
+
+def portfolio_path_stats(portfolio_values: np.ndarray, annualization_exponent: float):
+    """
+    Summary statistics of simulated portfolio values, computed in as few passes over the data as possible.
+
+    Args:
+        portfolio_values: (time_intervals, iteration) array from simulate_portfolio_value(_from_array).
+        annualization_exponent: 252 / time_intervals, used to annualize each path's total return.
+
+    Returns:
+        A tuple: (mean_path (time_intervals,), mean_final_value, std_of_annualized_path_returns,
+                  max_drawdown_of_mean_path)
+    """
+    portfolio_values = np.ascontiguousarray(portfolio_values, dtype=np.float64)
+    initial_value = float(portfolio_values[0, 0])
+    with _parallel_kernel_guard:
+        mean_path, mean_final_value, annualized_std, max_drawdown = _portfolio_stats_kernel(
+            portfolio_values, initial_value, float(annualization_exponent))
+    return mean_path, float(mean_final_value), float(annualized_std), float(max_drawdown)
+
+def warm_up_kernels() -> None:
+    """
+    Runs the compiled kernels once on tiny inputs so JIT compilation (or loading it from numba's
+    on-disk cache) happens at startup rather than inside the first simulation request.
+    """
+    # Shocks come from _standard_normal_shocks so the kernel is compiled for the (transposed) layout it gets
+    # (2, 2, 2) is the smallest shape whose transposed view is neither C- nor F-contiguous, like real inputs
+    with _parallel_kernel_guard:
+        _correlated_gbm_paths(np.ones(2), np.zeros(2), np.eye(2), _standard_normal_shocks((2, 2, 2), seed=0))
+        _correlated_gbm_paths(np.ones(2, dtype=np.float32), np.zeros(2, dtype=np.float32),
+                              np.eye(2, dtype=np.float32), _standard_normal_shocks((2, 2, 2), dtype=np.float32, seed=0))
+        _portfolio_values_kernel(np.ones(2), np.ones((2, 2, 2)))
+        _portfolio_values_kernel(np.ones(2, dtype=np.float32), np.ones((2, 2, 2), dtype=np.float32))
+        _portfolio_stats_kernel(np.ones((2, 2)), 1.0, 1.0)
+
+
+def _standard_normal_shocks(shape: tuple, dtype: type = np.float64, seed: Optional[int] = None) -> np.ndarray:
+    """
+    Draws a (num_assets, iteration, steps) array of N(0, 1) shocks with Generator.standard_normal
+    (NumPy's ziggurat sampler; no uniform draw + inverse-CDF).
+    The iteration axis is cut into fixed MC_RNG_BLOCK_PATHS-path blocks, each filled by its own
+    Generator(Philox) spawned from one SeedSequence. Blocks are statistically independent, and because
+    the blocking doesn't depend on MC_RNG_WORKERS the result is reproducible for a given seed on any machine.
+    """
+    num_assets, iteration, steps = shape
+    block_starts = range(0, iteration, MC_RNG_BLOCK_PATHS)
+    generators = [Generator(Philox(child)) for child in SeedSequence(seed).spawn(len(block_starts))]
+
+    # Stored iteration-major so every block is one contiguous slice the generator fills in place
+    # (no per-block arrays to concatenate); handed back as a (num_assets, iteration, steps) view
+    shocks = np.empty((iteration, num_assets, steps), dtype=dtype)
+
+    def draw(block: int) -> None:
+        start = block_starts[block]
+        generators[block].standard_normal(dtype=dtype, out=shocks[start:start + MC_RNG_BLOCK_PATHS])
+
+    num_workers = min(MC_RNG_WORKERS, len(block_starts))
+    if num_workers <= 1:
+        for block in range(len(block_starts)):
+            draw(block)
+    else:
+        with ThreadPoolExecutor(max_workers=num_workers) as executor:
+            list(executor.map(draw, range(len(block_starts))))
+    return shocks.transpose(1, 0, 2)
+
+# {(shape, dtype, bytes of cov_matrix): read-only Cholesky factor} for the most recently factored covariances,
+# so repeat simulations of the same portfolio (and other consumers of the same matrix) skip the O(N^3) step
+CHOLESKY_CACHE_MAX_ENTRIES = 8
+_cholesky_cache: "OrderedDict[tuple, np.ndarray]" = OrderedDict()
+_cholesky_cache_lock = threading.Lock() # Simulations may run on several worker threads at once
+
+def cholesky_with_jitter(cov_matrix: np.ndarray) -> Optional[np.ndarray]:
+    """
+    Lower-triangular Cholesky factor of cov_matrix, retrying once with a small diagonal jitter
+    if the matrix is not numerically positive definite. Returns None if both attempts fail.
+    Factors are cached by the matrix contents and returned read-only, since callers share them.
+    """
+    cov_matrix = np.ascontiguousarray(cov_matrix)
+    cache_key = (cov_matrix.shape, cov_matrix.dtype.str, cov_matrix.tobytes())
+    with _cholesky_cache_lock:
+        cached = _cholesky_cache.get(cache_key)
+        if cached is not None:
+            _cholesky_cache.move_to_end(cache_key)
+            return cached
+
+    try:
+        factor = np.linalg.cholesky(cov_matrix)
+    except np.linalg.LinAlgError:
+        print("WARNING: Covariance matrix is not positive semi-definite. Adding a small diagonal jitter.")
+        try:
+            factor = np.linalg.cholesky(cov_matrix + np.eye(cov_matrix.shape[0]) * 1e-7)
+        except np.linalg.LinAlgError as e:
+            print(f"CRITICAL ERROR: Still cannot perform Cholesky decomposition after jitter: {e}.")
+            return None
+
+    factor.flags.writeable = False
+    with _cholesky_cache_lock:
+        _cholesky_cache[cache_key] = factor
+        if len(_cholesky_cache) > CHOLESKY_CACHE_MAX_ENTRIES:
+            _cholesky_cache.popitem(last=False)
+    return factor
+
 
 def get_MonteCarloPaths_CorrelatedMultiAsset(
     symbols: List[str],
     cov_matrix: np.ndarray, # Pass the covariance matrix from Black-Litterman
     period: str = "10y",
     time_intervals: int = 252, # Default to ~1 year of trading days
-    iteration: int = 1000      # Number of simulation paths
-) -> Dict[str, np.ndarray]:
+    iteration: int = 1000,     # Number of simulation paths
+    data=None,                 # Optional prefetched download_prices() result covering `symbols`
+    dtype: type = np.float64,  # np.float32 halves the memory of the (N, iteration, time_intervals) tensors
+    cholesky_matrix: Optional[np.ndarray] = None, # Precomputed cholesky_with_jitter(cov_matrix), if the caller has one
+    seed: Optional[int] = None # Fix for reproducible paths; None draws fresh OS entropy
+) -> Tuple[List[str], np.ndarray]:
     """
     Generates correlated Monte Carlo price paths for multiple assets using Geometric Brownian Motion.
 
@@ -27,145 +287,106 @@ def get_MonteCarloPaths_CorrelatedMultiAsset(
         period: Historical data period (e.g., "1y", "6mo") for calculating initial drift.
         time_intervals: Number of time steps (e.g., trading days) for the simulation.
         iteration: Number of independent simulation paths.
+        data: Optional prefetched price download (e.g. the one already used for Black-Litterman).
+              May contain extra symbols; only `symbols` are extracted from it.
+        dtype: Floating type for the shocks and paths. Drift/covariance are still estimated in float64.
+        cholesky_matrix: Optional lower-triangular factor of cov_matrix; skips the O(N^3) decomposition.
+        seed: Optional seed for the shock generator.
 
     Returns:
-        A dictionary where keys are stock symbols and values are NumPy arrays
-        of simulated price paths (shape: time_intervals, iteration).
+        A tuple: (simulated_symbols, paths), where paths is a (len(simulated_symbols), time_intervals, iteration)
+        array and paths[i] holds the price paths of simulated_symbols[i]. Both are empty if nothing could be
+        simulated.
     """
     if not symbols:
         print("No symbols provided for Monte Carlo simulation.")
-        return {}
+        return [], np.empty((0, time_intervals, iteration), dtype=dtype)
 
     # 1. Download historical data for all symbols
-    # Use group_by='ticker' for multi-symbol downloads to get MultiIndex columns
-    data = yf.download(symbols, period=period, group_by='ticker', auto_adjust=True)
+    # Cached on disk per (symbols, period), so this usually reuses the Black-Litterman download
+    if data is None:
+        data = download_prices(symbols, period)
 
-    prices = pd.DataFrame()
-    successful_symbols = [] # Track which symbols actually downloaded data
-
-    # Robust extraction from MultiIndex DataFrame (or flat for single symbol)
-    for sym in symbols:
-        try:
-            if isinstance(data.columns, pd.MultiIndex): # Multi-symbol download
-                if (sym, 'Adj Close') in data.columns and not data[(sym, 'Adj Close')].empty:
-                    prices[sym] = data[(sym, 'Adj Close')]
-                elif (sym, 'Close') in data.columns and not data[(sym, 'Close')].empty: # Fallback to 'Close'
-                    prices[sym] = data[(sym, 'Close')]
-                else:
-                    raise KeyError(f"No valid 'Adj Close' or 'Close' data found for {sym} in MultiIndex.")
-            else: # Single symbol download (columns are not MultiIndex)
-                if 'Adj Close' in data.columns and not data['Adj Close'].empty:
-                    prices[sym] = data['Adj Close']
-                elif 'Close' in data.columns and not data['Close'].empty: # Fallback to 'Close'
-                    prices[sym] = data['Close']
-                else:
-                    raise KeyError(f"No valid 'Adj Close' or 'Close' data found for single symbol {sym}.")
-            
-            successful_symbols.append(sym)
-        except KeyError as e:
-            print(f"WARNING: Skipping '{sym}' due to missing or empty data: {e}. This symbol will be excluded from MC simulation.")
+    prices, successful_symbols = extract_close_prices(data, symbols) # Track which symbols actually downloaded data
 
     if not successful_symbols:
         print("ERROR: No valid stock data found for any of the provided symbols for Monte Carlo. Cannot proceed.")
-        return {} 
+        return [], np.empty((0, time_intervals, iteration), dtype=dtype)
 
-    prices = prices[successful_symbols].dropna()
+    prices = prices[~np.isnan(prices).any(axis=1)] # Drop dates where any symbol is missing
     
     symbols_for_mc = successful_symbols
     num_assets = len(symbols_for_mc) 
 
-    if prices.empty or len(prices) < 2:
+    if prices.shape[0] < 2:
         print(f"ERROR: Not enough historical data for {symbols_for_mc} to run Monte Carlo (need at least 2 data points after dropping NaNs).")
-        return {sym: np.zeros((time_intervals, iteration)) for sym in symbols_for_mc}
-
-    returns = np.log(prices / prices.shift(1)).dropna()
-
-    if returns.empty:
-        print(f"ERROR: Not enough valid returns for {symbols_for_mc} to run Monte Carlo.")
-        return {sym: np.zeros((time_intervals, iteration)) for sym in symbols_for_mc}
+        return symbols_for_mc, np.zeros((num_assets, time_intervals, iteration), dtype=dtype)
 
-    returns = returns[symbols_for_mc] # Ensure returns DataFrame uses the filtered symbols
-
-    mean_log_returns = returns.mean().values
+    if np.isfinite(prices).all() and (prices > 0).all():
+        # Every log return is finite and their mean telescopes (sum of log P_t - log P_t-1 = log P_last - log P_first),
+        # so only the first and last rows are needed instead of a full (T-1, N) returns array
+        mean_log_returns = (np.log(prices[-1]) - np.log(prices[0])) / (prices.shape[0] - 1)
+    else:
+        # Log returns on the raw array: log in place on our own copy, then difference into one preallocated buffer,
+        # dropping the dates whose return is not finite
+        log_prices = prices.copy()
+        np.log(log_prices, out=log_prices)
+        returns = np.empty((log_prices.shape[0] - 1, log_prices.shape[1]))
+        np.subtract(log_prices[1:], log_prices[:-1], out=returns)
+        returns = returns[np.isfinite(returns).all(axis=1)]
+
+        if returns.size == 0:
+            print(f"ERROR: Not enough valid returns for {symbols_for_mc} to run Monte Carlo.")
+            return symbols_for_mc, np.zeros((num_assets, time_intervals, iteration), dtype=dtype)
+
+        mean_log_returns = returns.mean(axis=0)
     
     if cov_matrix.shape != (num_assets, num_assets):
         raise ValueError(f"Covariance matrix dimensions {cov_matrix.shape} do not match the number of SUCCESSFULLY PROCESSED symbols ({num_assets}). "
                          "Ensure your cov_matrix corresponds to the `symbols` list that actually returned data.")
 
-    try:
-        cholesky_matrix = np.linalg.cholesky(cov_matrix)
-    except np.linalg.LinAlgError:
-        print(f"WARNING: Covariance matrix for {symbols_for_mc} is not positive semi-definite. Adding a small diagonal jitter.")
-        covariance_matrix_jittered = cov_matrix + np.eye(num_assets) * 1e-7
-        try:
-            cholesky_matrix = np.linalg.cholesky(covariance_matrix_jittered)
-        except np.linalg.LinAlgError as e:
-            print(f"CRITICAL ERROR: Still cannot perform Cholesky decomposition after jitter: {e}. Returning empty paths.")
-            return {sym: np.zeros((time_intervals, iteration)) for sym in symbols_for_mc}
-
-    # DEBUG PRINT: Check mean log returns and diagonal of cov_matrix used for drift/diffusion
-    print("\n--- DEBUG MC INPUTS ---")
-    print(f"Mean log returns: {mean_log_returns}")
-    print(f"Variances (diagonal of cov_matrix): {np.diag(cov_matrix)}")
-    print(f"Square root of variances (stdevs): {np.sqrt(np.diag(cov_matrix))}")
-
-    drift_vector = mean_log_returns - 0.5 * np.diag(cov_matrix)
-    
-    # DEBUG PRINT: Check the drift vector
-    print(f"Drift vector: {drift_vector}")
-
-
-    drift_vector_reshaped = drift_vector[:, np.newaxis, np.newaxis]
-
-    S0_vector = prices.iloc[-1].values
-    S0_vector_reshaped = S0_vector[:, np.newaxis]
-
-    all_price_paths_raw = np.zeros((num_assets, iteration, time_intervals))
-    all_price_paths_raw[:, :, 0] = S0_vector_reshaped
-
-    independent_shocks = norm.ppf(np.random.rand(num_assets, iteration, time_intervals - 1))
-    correlated_random_shocks = np.einsum('ij,jkl->ikl', cholesky_matrix, independent_shocks)
+    if cholesky_matrix is None:
+        cholesky_matrix = cholesky_with_jitter(cov_matrix)
+        if cholesky_matrix is None:
+            print(f"CRITICAL ERROR: Cannot perform Cholesky decomposition for {symbols_for_mc}. Returning empty paths.")
+            return symbols_for_mc, np.zeros((num_assets, time_intervals, iteration), dtype=dtype)
+    elif cholesky_matrix.shape != cov_matrix.shape:
+        raise ValueError(f"Cholesky factor dimensions {cholesky_matrix.shape} do not match the covariance matrix {cov_matrix.shape}.")
+
+    variances = np.diag(cov_matrix) # Shared by the drift and the volatility scaling below
+    stdevs = np.sqrt(variances)
+    # mean_log_returns - 0.5 * variances, built in one buffer (the caller's arrays are left untouched)
+    drift_vector = np.multiply(variances, -0.5)
+    drift_vector += mean_log_returns
+
+    if DEBUG_MC:
+        # Check mean log returns and diagonal of cov_matrix used for drift/diffusion
+        print("\n--- DEBUG MC INPUTS ---")
+        print(f"Mean log returns: {mean_log_returns}")
+        print(f"Variances (diagonal of cov_matrix): {variances}")
+        print(f"Square root of variances (stdevs): {stdevs}")
+        print(f"Drift vector: {drift_vector}")
+        print(f"VOLATILITY_MAGNIFICATION_FACTOR_GLOBAL being used: {VOLATILITY_MAGNIFICATION_FACTOR_GLOBAL}")
+
+    S0_vector = prices[-1].astype(dtype)
+
+    independent_shocks = _standard_normal_shocks((num_assets, iteration, time_intervals - 1), dtype=dtype, seed=seed)
 
     # --- FIX/DEBUG: Apply global volatility magnification factor ---
-    stdev_diag_cov = np.sqrt(np.diag(cov_matrix))[:, np.newaxis, np.newaxis]
-    random_term = correlated_random_shocks * stdev_diag_cov * VOLATILITY_MAGNIFICATION_FACTOR_GLOBAL # <--- Applied global factor
-
-    # DEBUG PRINT: Check daily return components after magnification
-    print("\n--- DEBUG DAILY RETURN COMPONENTS ---")
-    print(f"VOLATILITY_MAGNIFICATION_FACTOR_GLOBAL being used: {VOLATILITY_MAGNIFICATION_FACTOR_GLOBAL}") # Debug print
-    print(f"Shape of drift_vector_reshaped: {drift_vector_reshaped.shape}")
-    print(f"Shape of random_term (after magnification): {random_term.shape}")
-    print(f"Mean of drift_vector_reshaped: {np.mean(drift_vector_reshaped)}")
-    print(f"Mean of random_term (after magnification): {np.mean(random_term)}")
-    print(f"Std Dev of random_term (after magnification): {np.std(random_term)}")
-    if random_term.shape[0] > 0 and random_term.shape[1] > 0 and random_term.shape[2] > 5:
-        print(f"Sample random_term (first asset, first path, first 5 days): {random_term[0, 0, :5]}")
-        print(f"Sample drift_plus_random (first asset, first path, first 5 days): {(drift_vector_reshaped + random_term)[0, 0, :5]}")
-
-
-    daily_returns_matrix = np.exp(drift_vector_reshaped + random_term) 
-
-    # DEBUG PRINT: Check properties of daily_returns_matrix
-    print("\n--- DEBUG DAILY RETURNS MATRIX ---")
-    print(f"Shape of daily_returns_matrix: {daily_returns_matrix.shape}")
-    print(f"Mean of daily_returns_matrix: {np.mean(daily_returns_matrix)}")
-    print(f"Std Dev of daily_returns_matrix: {np.std(daily_returns_matrix)}")
-    if daily_returns_matrix.shape[0] > 0 and daily_returns_matrix.shape[1] > 0 and daily_returns_matrix.shape[2] > 5:
-        print(f"Sample daily_returns_matrix (first asset, first path, first 5 days): {daily_returns_matrix[0, 0, :5]}")
-    
+    # (L @ z) * stdev * factor == (diag(stdev * factor) @ L) @ z, so fold the scaling into the Cholesky factor once
+    volatility_scale = stdevs * VOLATILITY_MAGNIFICATION_FACTOR_GLOBAL # <--- Applied global factor
+    scaled_cholesky = (volatility_scale[:, np.newaxis] * cholesky_matrix).astype(dtype)
 
-    for t in range(1, time_intervals):
-        all_price_paths_raw[:, :, t] = all_price_paths_raw[:, :, t-1] * daily_returns_matrix[:, :, t-1]
+    with _parallel_kernel_guard:
+        all_price_paths_raw = _correlated_gbm_paths(np.ascontiguousarray(S0_vector), drift_vector.astype(dtype),
+                                                    np.ascontiguousarray(scaled_cholesky), independent_shocks)
 
-    simulated_paths_dict = {}
-    for i, sym in enumerate(symbols_for_mc):
-        simulated_paths_dict[sym] = all_price_paths_raw[i, :, :].T
-
-    return simulated_paths_dict
+    # Already (num_assets, time_intervals, iteration) in symbols_for_mc order, so it is returned as is
+    return symbols_for_mc, all_price_paths_raw
 
 def simulate_portfolio_value(initial_portfolio_value: float,
                              optimal_weights: np.ndarray,
-                             simulated_asset_paths: Dict[str, np.ndarray]) -> np.ndarray:
+                             simulated_asset_paths: np.ndarray) -> np.ndarray:
     """
     Simulates the total portfolio value over time using individual asset paths and optimal weights.
     Assumes a fixed weighting (no rebalancing) throughout the simulation horizon.
@@ -173,45 +394,71 @@ def simulate_portfolio_value(initial_portfolio_value: float,
     Args:
         initial_portfolio_value: The starting value of the portfolio.
         optimal_weights: (N, 1) array of optimal portfolio weights for each asset.
-        simulated_asset_paths: Dictionary {symbol: (time_intervals, iteration) array}
-                               containing simulated price paths for each asset.
+        simulated_asset_paths: (N, time_intervals, iteration) paths array from
+                               get_MonteCarloPaths_CorrelatedMultiAsset, in the same asset order as the weights.
 
     Returns:
-        Posterior expected returns (N, 1) array.
+        (time_intervals, iteration) float64 array of simulated portfolio values.
     """
-    if not simulated_asset_paths:
+    if simulated_asset_paths.size == 0:
         print("No simulated asset paths provided.")
         return np.array([])
 
-    symbols_in_order = list(simulated_asset_paths.keys())
-    
-    if optimal_weights.shape[0] != len(symbols_in_order):
-        raise ValueError("Number of optimal weights does not match number of simulated assets.")
+    return simulate_portfolio_value_from_array(initial_portfolio_value, optimal_weights.ravel(), simulated_asset_paths)
 
-    optimal_weights_flat = optimal_weights.flatten()
+def simulate_portfolio_value_from_array(initial_portfolio_value: float,
+                                        weights: np.ndarray,
+                                        asset_paths: np.ndarray) -> np.ndarray:
+    """
+    Core of simulate_portfolio_value, for callers that already hold flat (N,) weights.
+
+    Args:
+        initial_portfolio_value: The starting value of the portfolio.
+        weights: (N,) array of portfolio weights, in the same asset order as asset_paths.
+        asset_paths: (N, time_intervals, iteration) array of simulated price paths.
+
+    Returns:
+        (time_intervals, iteration) float64 array of simulated portfolio values.
+    """
+    if weights.shape[0] != asset_paths.shape[0]:
+        raise ValueError("Number of optimal weights does not match number of simulated assets.")
 
-    time_intervals, num_iterations = simulated_asset_paths[symbols_in_order[0]].shape
+    initial_prices = asset_paths[:, 0, 0]
+    num_shares = np.zeros(weights.shape[0], dtype=asset_paths.dtype) # Match the paths so float32 stays float32
+    np.divide(initial_portfolio_value * weights, initial_prices, out=num_shares, where=initial_prices != 0,
+              casting='unsafe')
 
-    portfolio_values = np.zeros((time_intervals, num_iterations))
+    # asarray drops np.memmap down to a plain ndarray view, which the compiled kernel accepts
+    with _parallel_kernel_guard:
+        portfolio_values = _portfolio_values_kernel(num_shares, np.asarray(asset_paths))
+    portfolio_values[0, :] = initial_portfolio_value # Ensure day 0 is correct
+    return portfolio_values
 
-    initial_allocations = initial_portfolio_value * optimal_weights_flat
+def simulate_portfolio_values_batch(initial_portfolio_value: float,
+                                    weights_matrix: np.ndarray,
+                                    asset_paths: np.ndarray) -> np.ndarray:
+    """
+    simulate_portfolio_value for K weight vectors at once, reading the asset paths a single time.
 
-    initial_prices = np.array([simulated_asset_paths[sym][0, 0] for sym in symbols_in_order])
+    Args:
+        initial_portfolio_value: The starting value of every portfolio.
+        weights_matrix: (N, K) array whose columns are the portfolio weights to try, in asset_paths order.
+        asset_paths: (N, time_intervals, iteration) array of simulated price paths.
 
-    num_shares = np.zeros_like(initial_allocations)
-    non_zero_price_indices = initial_prices != 0
-    num_shares[non_zero_price_indices] = initial_allocations[non_zero_price_indices] / initial_prices[non_zero_price_indices]
+    Returns:
+        (K, time_intervals, iteration) float64 array; [k] matches simulate_portfolio_value for weights_matrix[:, k].
+    """
+    if weights_matrix.shape[0] != asset_paths.shape[0]:
+        raise ValueError("Number of optimal weights does not match number of simulated assets.")
 
-    for i in range(num_iterations):
-        for t in range(1, time_intervals): # Changed range to start from 1 to align with returns calculation
-            current_portfolio_value_path_i = 0
-            for j, sym in enumerate(symbols_in_order):
-                asset_value_in_path_i_at_t = num_shares[j] * simulated_asset_paths[sym][t, i]
-                current_portfolio_value_path_i += asset_value_in_path_i_at_t
-            portfolio_values[t, i] = current_portfolio_value_path_i
-        # Set initial value for portfolio_values for day 0
-        portfolio_values[0, i] = initial_portfolio_value # Ensure day 0 is correct
+    initial_prices = asset_paths[:, 0, 0, np.newaxis]
+    num_shares = np.zeros(weights_matrix.shape, dtype=asset_paths.dtype)
+    np.divide(initial_portfolio_value * weights_matrix, initial_prices, out=num_shares, where=initial_prices != 0,
+              casting='unsafe')
 
+    # (K, N) x (N, T*I): one GEMM over the paths instead of K separate GEMVs
+    portfolio_values = np.tensordot(num_shares.T, asset_paths, axes=(1, 0)).astype(np.float64, copy=False)
+    portfolio_values[:, 0, :] = initial_portfolio_value # Ensure day 0 is correct
     return portfolio_values
 
 # --- Test block for montecarlo.py (will only run if montecarlo.py is executed directly) ---
@@ -229,7 +476,7 @@ if __name__ == "__main__":
     test_optimal_weights_mc = np.array([[0.6], [0.4]])
 
     print("\n1. Testing get_MonteCarloPaths_CorrelatedMultiAsset...")
-    sim_paths_mc = get_MonteCarloPaths_CorrelatedMultiAsset(
+    actual_simulated_symbols, sim_paths_mc = get_MonteCarloPaths_CorrelatedMultiAsset(
         symbols=test_symbols_mc,
         cov_matrix=test_cov_matrix_mc,
         period=test_period_mc,
@@ -237,10 +484,8 @@ if __name__ == "__main__":
         iteration=test_iteration_mc
     )
 
-    if sim_paths_mc:
-        # Get the actual symbols that were successfully simulated
-        actual_simulated_symbols = list(sim_paths_mc.keys())
-        print(f"Generated paths for {actual_simulated_symbols}. Example path for {actual_simulated_symbols[0]}:\n{sim_paths_mc[actual_simulated_symbols[0]][:, 0]}")
+    if actual_simulated_symbols:
+        print(f"Generated paths for {actual_simulated_symbols}. Example path for {actual_simulated_symbols[0]}:\n{sim_paths_mc[0, :, 0]}")
 
         print("\n2. Testing simulate_portfolio_value...")
         
@@ -1,9 +1,12 @@
 import numpy as np
 import pandas as pd
 import matplotlib.pyplot as plt
-from typing import List, Dict
+from typing import List, Dict, Optional, Tuple
+import os
 import sys
-import yfinance as yf # Import yfinance for individual stock historical data if needed for plotting
+import argparse
+import hashlib
+import threading
 
 # Import functions from your custom modules
 # Make sure blacklitterman.py and montecarlo.py are in the same directory
@@ -14,9 +17,13 @@ from Blacklitterman import (
     calculate_posterior_returns,
     calculate_optimal_weights
 )
+from data_cache import PRICE_CACHE_TTL, clear_cache, fetch_last_prices, load_cached, save_cached
 from monte_carlo import (
     get_MonteCarloPaths_CorrelatedMultiAsset,
-    simulate_portfolio_value
+    cholesky_with_jitter,
+    simulate_portfolio_value,
+    simulate_portfolio_values_batch,
+    warm_up_kernels
 )
 
 # --- GLOBAL CONFIGURATION (can be moved to a config file if project grows) ---
@@ -25,32 +32,32 @@ AVAILABLE_SYMBOLS = ['AAPL', 'MSFT', 'GOOG', 'AMZN', 'NVDA', 'TSLA', 'JPM', 'GS'
 
 # --- Plotting Functions ---
 
+# Figure labels passed as plt.figure(num=...): pyplot hands back the existing figure while it is open
+PORTFOLIO_FIGURE = 'Portfolio Simulation'
+STOCK_FIGURE = 'Stock Simulation'
+
 def plot_monte_carlo_results(simulated_values: np.ndarray, initial_value: float, title_suffix: str = ""):
     """
-    Plots a subset of Monte Carlo paths, the average path, and key percentile paths for a portfolio.
+    Plots the 10-90% and 25-75% bands of simulated portfolio values with the median and average paths.
     """
-    plt.figure(figsize=(14, 8)) 
-
-    num_paths_to_plot = min(200, simulated_values.shape[1]) 
-    plt.plot(simulated_values[:, :num_paths_to_plot], alpha=0.08, color='lightgray', linewidth=0.8)
+    # One named figure reused (and cleared) on every call, so repeated rounds don't pile up figures
+    plt.figure(num=PORTFOLIO_FIGURE, figsize=(14, 8), clear=True)
 
-    p10 = np.percentile(simulated_values, 10, axis=1)
-    p25 = np.percentile(simulated_values, 25, axis=1)
-    p50 = np.percentile(simulated_values, 50, axis=1) # Median path
-    p75 = np.percentile(simulated_values, 75, axis=1)
-    p90 = np.percentile(simulated_values, 90, axis=1)
+    # All five percentile paths from one call (one partition of the data instead of five)
+    p10, p25, p50, p75, p90 = np.percentile(simulated_values, [10, 25, 50, 75, 90], axis=1) # p50 = median path
 
-    plt.plot(p90, color='orange', linestyle=':', linewidth=1.5, label='90th Percentile')
-    plt.plot(p75, color='green', linestyle=':', linewidth=1.5, label='75th Percentile')
+    # Two shaded bands instead of hundreds of individual paths: a few polygons for the renderer instead of
+    # one line artist per sample path
+    time_steps = np.arange(simulated_values.shape[0])
+    plt.fill_between(time_steps, p10, p90, color='lightgray', alpha=0.5, label='10th-90th Percentile')
+    plt.fill_between(time_steps, p25, p75, color='gray', alpha=0.4, label='25th-75th Percentile')
     plt.plot(p50, color='purple', linestyle='-', linewidth=2.5, label='Median Path')
-    plt.plot(p25, color='green', linestyle=':', linewidth=1.5, label='25th Percentile')
-    plt.plot(p10, color='red', linestyle=':', linewidth=1.5, label='10th Percentile')
 
     plt.plot(np.mean(simulated_values, axis=1), color='blue', linestyle='--', linewidth=2.5, label='Average Path')
     
     plt.axhline(y=initial_value, color='black', linestyle='-.', label='Initial Value')
 
-    plt.title(f'Monte Carlo Simulation of Portfolio Value {title_suffix}\n(Showing {num_paths_to_plot} Sample Paths & Key Percentiles)', fontsize=16)
+    plt.title(f'Monte Carlo Simulation of Portfolio Value {title_suffix}\n(Median, Average & Percentile Bands)', fontsize=16)
     plt.xlabel('Time Steps (Days)', fontsize=12)
     plt.ylabel('Portfolio Value ($)', fontsize=12)
     plt.grid(True, linestyle='--', alpha=0.7)
@@ -58,55 +65,149 @@ def plot_monte_carlo_results(simulated_values: np.ndarray, initial_value: float,
     plt.tight_layout(rect=[0, 0, 0.88, 1])
     plt.show()
 
-def plot_single_stock_mc(symbol: str, simulated_paths: np.ndarray, historical_price: float, time_intervals: int):
+def stock_path_bands(simulated_paths: np.ndarray) -> Dict[str, np.ndarray]:
+    """
+    Average and 10th/25th/50th/75th/90th percentile paths of a single stock's simulated prices (no plotting).
+    Also takes a stacked (N, time_intervals, iteration) array and then returns (N, time_intervals) bands.
+    """
+    # All five percentiles from one call, over the last (iteration) axis, for every stock given at once
+    p10, p25, p50, p75, p90 = np.percentile(simulated_paths, [10, 25, 50, 75, 90], axis=-1)
+    return {"mean": np.mean(simulated_paths, axis=-1), "p10": p10, "p25": p25, "p50": p50, "p75": p75, "p90": p90}
+
+def plot_single_stock_mc(symbol: str, simulated_paths: np.ndarray, historical_price: float, time_intervals: int,
+                         bands: Optional[Dict[str, np.ndarray]] = None, ax: Optional[plt.Axes] = None):
     """
     Plots Monte Carlo price paths for a single stock.
+    Pass a precomputed stock_path_bands() result as bands to skip recomputing the average/percentile paths.
+    Pass ax to draw into one panel of a larger figure; the caller then owns the figure and plt.show().
     """
-    plt.figure(figsize=(12, 7))
-    num_paths_to_plot = min(200, simulated_paths.shape[1])
-    
-    plt.plot(simulated_paths[:, :num_paths_to_plot], alpha=0.1, color='lightblue', linewidth=0.8)
-    plt.plot(np.mean(simulated_paths, axis=1), color='darkblue', linestyle='--', label='Average Path')
-    
-    # Add percentiles for single stock too
-    p10 = np.percentile(simulated_paths, 10, axis=1)
-    p50 = np.percentile(simulated_paths, 50, axis=1)
-    p90 = np.percentile(simulated_paths, 90, axis=1)
-    
-    plt.plot(p90, color='orange', linestyle=':', linewidth=1.5, label='90th Percentile')
-    plt.plot(p50, color='purple', linestyle='-', linewidth=2.5, label='Median Path')
-    plt.plot(p10, color='red', linestyle=':', linewidth=1.5, label='10th Percentile')
+    if bands is None:
+        bands = stock_path_bands(simulated_paths)
 
-    # Ensure historical_price is a scalar before passing to axhline
-    plt.axhline(y=historical_price, color='black', linestyle='-.', label='Historical Start Price') # `historical_price` is already a scalar due to .item() fix
+    standalone = ax is None
+    if standalone:
+        plt.figure(num=STOCK_FIGURE, figsize=(12, 7), clear=True) # Reused across stocks, like PORTFOLIO_FIGURE
+        ax = plt.gca()
 
-    plt.title(f'Monte Carlo Simulation for {symbol} Stock Price\n(Showing {num_paths_to_plot} Sample Paths & Key Percentiles)', fontsize=16)
-    plt.xlabel('Time Steps (Days)', fontsize=12)
-    plt.ylabel('Stock Price ($)', fontsize=12)
-    plt.grid(True, linestyle='--', alpha=0.7)
-    plt.legend(loc='upper left', bbox_to_anchor=(1,1))
+    # Percentile bands rather than individual sample paths (see plot_monte_carlo_results)
+    time_steps = np.arange(simulated_paths.shape[0])
+    ax.fill_between(time_steps, bands["p10"], bands["p90"], color='lightblue', alpha=0.4, label='10th-90th Percentile')
+    ax.fill_between(time_steps, bands["p25"], bands["p75"], color='steelblue', alpha=0.35, label='25th-75th Percentile')
+    ax.plot(bands["mean"], color='darkblue', linestyle='--', label='Average Path')
+    ax.plot(bands["p50"], color='purple', linestyle='-', linewidth=2.5, label='Median Path')
+
+    # Ensure historical_price is a scalar before passing to axhline
+    ax.axhline(y=historical_price, color='black', linestyle='-.', label='Historical Start Price') # `historical_price` is already a scalar due to .item() fix
+
+    ax.set_xlabel('Time Steps (Days)', fontsize=12)
+    ax.set_ylabel('Stock Price ($)', fontsize=12)
+    ax.grid(True, linestyle='--', alpha=0.7)
+    if not standalone:
+        ax.set_title(f'{symbol}', fontsize=14)
+        ax.legend(loc='upper left', fontsize=8)
+        return
+
+    ax.set_title(f'Monte Carlo Simulation for {symbol} Stock Price\n(Median, Average & Percentile Bands)', fontsize=16)
+    ax.legend(loc='upper left', bbox_to_anchor=(1,1))
     plt.tight_layout(rect=[0, 0, 0.88, 1])
     plt.show()
 
+def plot_stock_previews(symbols: List[str], asset_paths: np.ndarray, start_prices: List[float], time_intervals: int,
+                        bands: Optional[Dict[str, np.ndarray]] = None):
+    """
+    Plots every stock's simulation as one panel of a single two-column figure, shown once.
+    Pass a precomputed stock_path_bands(asset_paths) result as bands to skip recomputing it.
+    """
+    if bands is None:
+        bands = stock_path_bands(asset_paths)
+
+    num_rows = (len(symbols) + 1) // 2
+    fig, axes = plt.subplots(nrows=num_rows, ncols=2, figsize=(16, 4 * num_rows), num=STOCK_FIGURE, clear=True,
+                             squeeze=False)
+    for i, (ax, symbol, sim_paths_for_stock, start_price) in enumerate(zip(axes.flat, symbols, asset_paths, start_prices)):
+        stock_bands = {name: band[i] for name, band in bands.items()}
+        plot_single_stock_mc(symbol, sim_paths_for_stock, start_price, time_intervals, bands=stock_bands, ax=ax)
+    for ax in axes.flat[len(symbols):]: # Odd number of stocks leaves the last panel empty
+        ax.set_visible(False)
+    fig.suptitle('Monte Carlo Simulations of Individual Stock Prices (Median, Average & Percentile Bands)', fontsize=16)
+    fig.tight_layout()
+    plt.show()
+
 
 # --- Utility Functions ---
 
-def display_simulation_summary(simulated_values: np.ndarray, initial_value: float, time_intervals: int):
-    """Prints key statistics from the Monte Carlo simulation."""
-    final_values = simulated_values[-1, :]
+VAR_LEVEL = 0.05
+
+def summarize_simulation(simulated_values: np.ndarray, initial_value) -> Dict[str, float]:
+    """
+    Key statistics of the final simulated values (pure NumPy, no printing), as used by display_simulation_summary.
+    Also takes a stacked (K, time_intervals, iteration) array with K initial values and then returns (K,) arrays.
+    """
+    # Sort the final values once: min, max, median, VaR and the below-initial count are then index lookups
+    # instead of separate scans/partitions (same results as np.min/max/median/percentile and the mean of a mask)
+    final_values = np.sort(simulated_values[..., -1, :], axis=-1)
+    n = final_values.shape[-1]
+
+    # np.percentile's default linear interpolation between the two neighbouring order statistics
+    var_position = VAR_LEVEL * (n - 1)
+    var_index = int(var_position)
+    var_lower = final_values[..., var_index]
+    var_upper = final_values[..., min(var_index + 1, n - 1)]
+    # Same count as searchsorted(side='left') on each sorted row, broadcast over all rows at once
+    num_below_initial = np.count_nonzero(final_values < np.asarray(initial_value)[..., np.newaxis], axis=-1)
+    return {
+        "mean": np.mean(final_values, axis=-1),
+        "median": (final_values[..., (n - 1) // 2] + final_values[..., n // 2]) / 2,
+        "std": np.std(final_values, axis=-1),
+        "min": final_values[..., 0],
+        "max": final_values[..., -1],
+        "var": var_lower + (var_upper - var_lower) * (var_position - var_index),
+        "probability_below_initial": num_below_initial / n,
+    }
+
+def display_simulation_summary(simulated_values: np.ndarray, initial_value: float, time_intervals: int,
+                               summary: Optional[Dict[str, float]] = None):
+    """
+    Prints key statistics from the Monte Carlo simulation.
+    Pass a precomputed summarize_simulation() result as summary to skip recomputing it.
+    """
+    if summary is None:
+        summary = summarize_simulation(simulated_values, initial_value)
     print(f"\n--- Simulation Summary (after {time_intervals} days) ---")
-    print(f"  - Average Ending Value: ${np.mean(final_values):,.2f}")
-    print(f"  - Median Ending Value: ${np.median(final_values):,.2f}")
-    print(f"  - Standard Deviation of Ending Value: ${np.std(final_values):,.2f}")
-    print(f"  - Minimum Ending Value (Worst Case): ${np.min(final_values):,.2f}")
-    print(f"  - Maximum Ending Value (Best Case): ${np.max(final_values):,.2f}")
-
-    var_level = 0.05
-    VaR = np.percentile(final_values, var_level * 100)
-    print(f"  - Value at Risk ({var_level*100:.0f}th percentile, i.e., 5% chance of falling below): ${VaR:,.2f}")
-    print(f"  - Probability of ending below initial value: {np.mean(final_values < initial_value) * 100:.2f}%")
+    print(f"  - Average Ending Value: ${summary['mean']:,.2f}")
+    print(f"  - Median Ending Value: ${summary['median']:,.2f}")
+    print(f"  - Standard Deviation of Ending Value: ${summary['std']:,.2f}")
+    print(f"  - Minimum Ending Value (Worst Case): ${summary['min']:,.2f}")
+    print(f"  - Maximum Ending Value (Best Case): ${summary['max']:,.2f}")
+    print(f"  - Value at Risk ({VAR_LEVEL*100:.0f}th percentile, i.e., 5% chance of falling below): ${summary['var']:,.2f}")
+    print(f"  - Probability of ending below initial value: {summary['probability_below_initial'] * 100:.2f}%")
     print("\nRemember, these simulations show a *range* of possible outcomes due to market uncertainty, not a guarantee.")
 
+def load_or_simulate_asset_paths(symbols: List[str], cov_matrix: np.ndarray, period: str, time_intervals: int,
+                                 iteration: int, seed: Optional[int] = None) -> Tuple[List[str], np.ndarray]:
+    """
+    float32 get_MonteCarloPaths_CorrelatedMultiAsset, cached on disk when a seed is given.
+    A seeded run is fully determined by its inputs, so a replay of the same universe loads the paths
+    instead of re-simulating them; unseeded runs always draw fresh paths.
+    """
+    if seed is None:
+        return get_MonteCarloPaths_CorrelatedMultiAsset(symbols=symbols, cov_matrix=cov_matrix, period=period,
+                                                        time_intervals=time_intervals, iteration=iteration,
+                                                        dtype=np.float32)
+
+    # Paths follow the symbol order, and the covariance hash ties the entry to the market data it came from
+    cov_digest = hashlib.md5(np.ascontiguousarray(cov_matrix, dtype=np.float64).tobytes()).hexdigest()
+    key = f"mc_paths|{symbols}|{period}|{time_intervals}|{iteration}|{seed}|{cov_digest}"
+    cached = load_cached(key, PRICE_CACHE_TTL)
+    if cached is not None:
+        return cached
+
+    simulated = get_MonteCarloPaths_CorrelatedMultiAsset(symbols=symbols, cov_matrix=cov_matrix, period=period,
+                                                         time_intervals=time_intervals, iteration=iteration,
+                                                         dtype=np.float32, seed=seed)
+    if simulated[1].size: # Never cache a failed simulation
+        save_cached(key, simulated)
+    return simulated
 
 def get_user_selected_symbols(available_symbols: List[str]) -> List[str]:
     """Prompts the user to select symbols from a list."""
@@ -132,34 +233,82 @@ def get_user_selected_symbols(available_symbols: List[str]) -> List[str]:
 
 
 def get_user_weights(symbols: List[str]) -> np.ndarray:
-    """Prompts the user to input portfolio weights for each symbol."""
-    weights = []
+    """Prompts the user to input portfolio weights for each symbol. Returns a C-contiguous float64 (N, 1) array."""
+    user_weights = np.empty((len(symbols), 1)) # Filled in place, so no list-to-array copy afterwards
     print("\n--- Enter Your Portfolio Weights (as decimals, e.g., 0.3 for 30%) ---")
     print("  Weights will be normalized to sum to 1. Negative weights allow short-selling (advanced).")
-    for symbol in symbols:
+    for i, symbol in enumerate(symbols):
         while True:
             try:
-                weight = float(input(f"Enter weight for {symbol}: "))
-                weights.append(weight)
+                user_weights[i, 0] = float(input(f"Enter weight for {symbol}: "))
                 break
             except ValueError:
                 print("Invalid input. Please enter a number.")
     
-    user_weights = np.array(weights).reshape(-1, 1)
-    
     # Normalize user weights to sum to 1
-    total_sum = np.sum(user_weights)
+    total_sum = user_weights.sum()
     if total_sum == 0:
         print("WARNING: Your entered weights sum to zero. Defaulting to equal weights for simulation.")
-        return np.ones((len(symbols), 1)) / len(symbols)
-    elif abs(total_sum - 1.0) > 1e-6: # Check if sum is close to 1
+        return np.full((len(symbols), 1), 1.0 / len(symbols))
+    if abs(total_sum - 1.0) > 1e-6: # Check if sum is close to 1
         print(f"NOTE: Your weights sum to {total_sum:.2f}. Normalizing to 1.")
-        return user_weights / total_sum
-    else:
-        return user_weights
+        user_weights /= total_sum # In place: the array is ours
+    return user_weights
+
+# Each trial holds a (time_intervals, iteration) float64 value array, so cap how many are simulated at once
+MAX_SWEEP_TRIALS = 50
+# SeedSequence spawn key of the sweep's random weights, kept apart from the Monte Carlo shock streams
+SWEEP_SPAWN_KEY = (0, 1)
+
+def run_weight_sweep(symbols: List[str], asset_paths: np.ndarray, initial_value: float, time_intervals: int,
+                     rng: np.random.Generator) -> None:
+    """
+    Simulates a batch of random long-only portfolios in one pass over the asset paths, prints them ranked by
+    median ending value, and plots the best one.
+    """
+    while True:
+        try:
+            num_trials = int(input(f"How many random portfolios should be tried (1-{MAX_SWEEP_TRIALS})? "))
+            if 1 <= num_trials <= MAX_SWEEP_TRIALS:
+                break
+        except ValueError:
+            pass
+        print(f"Invalid input. Please enter a whole number from 1 to {MAX_SWEEP_TRIALS}.")
+
+    # Dirichlet draws are non-negative and sum to 1: random fully invested portfolios, one per column
+    weights_matrix = rng.dirichlet(np.ones(len(symbols)), size=num_trials).T
+    all_portfolio_values = simulate_portfolio_values_batch(initial_value, weights_matrix, asset_paths)
+    summaries = summarize_simulation(all_portfolio_values, np.full(num_trials, initial_value)) # All trials at once
+
+    results = pd.DataFrame(weights_matrix.T, columns=symbols)
+    results['Median End Value'] = summaries['median']
+    results['P(Below Initial)'] = summaries['probability_below_initial']
+    results = results.sort_values('Median End Value', ascending=False)
+    print("\n--- Random Portfolios, Best Median Ending Value First ---")
+    print(results.round(3).to_string(index=False))
+
+    best = results.index[0]
+    plot_monte_carlo_results(all_portfolio_values[best], initial_value, title_suffix=" - Best Random Portfolio")
+    display_simulation_summary(all_portfolio_values[best], initial_value, time_intervals,
+                               summary={name: values[best] for name, values in summaries.items()})
 
 # --- Main Portfolio Game Logic ---
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Portfolio Simulation Game")
+    # INVEXIS_SEED sets a default seed without passing --seed on every run
+    env_seed = os.environ.get("INVEXIS_SEED")
+    parser.add_argument("--seed", type=int, default=int(env_seed) if env_seed else None,
+                        help="Seed the simulations (default: $INVEXIS_SEED); seeded runs repeat exactly and reuse cached paths")
+    parser.add_argument("--refresh", action="store_true",
+                        help="Delete cached market data and simulations before starting")
+    args = parser.parse_args()
+    if args.refresh:
+        clear_cache()
+
+    # Compile (or load from numba's on-disk cache) the simulation kernels while the user is still picking stocks
+    warm_up_thread = threading.Thread(target=warm_up_kernels, daemon=True)
+    warm_up_thread.start()
+
     print("🚀 Welcome to the Portfolio Simulation Game! 🚀")
     print("Your goal: Allocate your initial $100,000 portfolio among selected assets.")
     print("Let's see if your intuition can beat the Black-Litterman model!")
@@ -203,21 +352,24 @@ if __name__ == "__main__":
         sys.exit(1)
 
     # --- Step 2: Pre-simulate Asset Paths (once for efficiency and individual plots) ---
+    warm_up_thread.join()
     print("\n--- Pre-simulating individual asset price paths (generating possible future scenarios) ---")
     # This will generate paths for the `symbols_for_game` (which are already filtered)
-    shared_simulated_asset_paths = get_MonteCarloPaths_CorrelatedMultiAsset(
-        symbols=symbols_for_game, 
-        cov_matrix=cov_matrix_daily_np, # This cov matrix is already aligned with `symbols_for_game`
-        period=historical_period, # Use same period for consistency
-        time_intervals=num_time_intervals,
-        iteration=num_simulations
+    # float32 halves the path memory; portfolio values are still accumulated into float64
+    simulated_symbols, shared_simulated_asset_paths = load_or_simulate_asset_paths(
+        symbols_for_game,
+        cov_matrix_daily_np, # This cov matrix is already aligned with `symbols_for_game`
+        historical_period, # Use same period for consistency
+        num_time_intervals,
+        num_simulations,
+        seed=args.seed
     )
-    if not shared_simulated_asset_paths:
+    if shared_simulated_asset_paths.size == 0:
         print("ERROR: Individual asset simulation failed. Cannot continue game.")
         sys.exit(1)
     
     # Final check: update symbols_for_game based on what MC simulation *actually* generated paths for
-    symbols_for_game = list(shared_simulated_asset_paths.keys())
+    symbols_for_game = simulated_symbols
     if not symbols_for_game:
         print("ERROR: No assets successfully simulated. Exiting game.")
         sys.exit(1)
@@ -227,27 +379,35 @@ if __name__ == "__main__":
     # --- Step 3: Show Individual Stock Simulations ---
     print("\n--- Individual Stock Performance Preview ---")
     print("Here's a preview of how each selected stock *might* perform in the future, based on historical data.")
-    for symbol in symbols_for_game:
-        sim_paths_for_stock = shared_simulated_asset_paths[symbol]
-        
-        # Get the actual last historical price for plotting reference
-        try:
-            hist_data = yf.download(symbol, period='1d', auto_adjust=True, progress=False)
-            if not hist_data.empty and 'Close' in hist_data.columns:
-                 historical_start_price = hist_data['Close'].iloc[-1].item() # .item() to get scalar
-            elif 'Adj Close' in hist_data.columns and not hist_data['Adj Close'].empty:
-                 historical_start_price = hist_data['Adj Close'].iloc[-1].item() # .item() to get scalar
-            else:
-                 print(f"Warning: Could not get last historical price for {symbol}. Using simulated start price.")
-                 historical_start_price = sim_paths_for_stock[0, 0].item() # .item() for consistency
-        except Exception as e:
-            print(f"Warning: Error fetching historical price for {symbol}: {e}. Using simulated start price.")
+    # Get the actual last historical price of every stock for plotting reference in one batched download
+    try:
+        last_prices = fetch_last_prices(symbols_for_game)
+    except Exception as e:
+        print(f"Warning: Error fetching historical prices: {e}. Using simulated start prices.")
+        last_prices = {}
+
+    start_prices = []
+    for symbol, sim_paths_for_stock in zip(symbols_for_game, shared_simulated_asset_paths):
+        historical_start_price = last_prices.get(symbol)
+        if historical_start_price is None:
+            print(f"Warning: Could not get last historical price for {symbol}. Using simulated start price.")
             historical_start_price = sim_paths_for_stock[0, 0].item() # .item() for consistency
+        start_prices.append(historical_start_price)
+
+    # Reduce every stock's paths up front with one vectorized call each over the stacked (N, T, I) array
+    # (one percentile partition and one sort for all stocks), so what follows only prints and plots
+    preview_bands = stock_path_bands(shared_simulated_asset_paths)
+    preview_summaries = summarize_simulation(shared_simulated_asset_paths, start_prices)
 
-        plot_single_stock_mc(symbol, sim_paths_for_stock, historical_start_price, num_time_intervals)
+    for i, (symbol, sim_paths_for_stock, historical_start_price) in enumerate(
+            zip(symbols_for_game, shared_simulated_asset_paths, start_prices)):
         print(f"\nSummary for {symbol}:")
-        display_simulation_summary(sim_paths_for_stock, historical_start_price, num_time_intervals)
-        input("Press Enter to see the next stock simulation... (or Ctrl+C to quit early)") # Pause for user
+        summary = {name: values[i] for name, values in preview_summaries.items()}
+        display_simulation_summary(sim_paths_for_stock, historical_start_price, num_time_intervals, summary=summary)
+
+    # All stocks in one figure, so the preview needs a single window instead of a prompt per stock
+    plot_stock_previews(symbols_for_game, shared_simulated_asset_paths, start_prices, num_time_intervals,
+                        bands=preview_bands)
     print("Individual stock previews complete.")
 
 
@@ -275,9 +435,14 @@ if __name__ == "__main__":
     bl_optimal_weights = calculate_optimal_weights(
         posterior_returns=bl_posterior_returns,
         cov_matrix=cov_matrix_daily_np,
-        risk_aversion=risk_aversion_opt
+        risk_aversion=risk_aversion_opt,
+        chol=cholesky_with_jitter(cov_matrix_daily_np) # Cached from the Monte Carlo run above
     )
     
+    # Derived from the same seed the asset paths were drawn from, so one --seed replays the whole game.
+    # The paths use SeedSequence(seed).spawn(...) children (one-word spawn keys); this two-word key never matches one
+    sweep_rng = np.random.default_rng(np.random.SeedSequence(args.seed, spawn_key=SWEEP_SPAWN_KEY))
+
     # --- Game Play Loop ---
     while True:
         print("\n" + "="*70)
@@ -299,7 +464,7 @@ if __name__ == "__main__":
         plot_monte_carlo_results(user_portfolio_values, initial_portfolio_value, title_suffix=" - YOUR Portfolio")
         display_simulation_summary(user_portfolio_values, initial_portfolio_value, num_time_intervals)
 
-        play_again_input = input("\nWould you like to (1) Try different weights ('yes'), (2) See the optimal solution ('show'), or (3) Exit the game ('exit')? Enter your choice: ").lower().strip()
+        play_again_input = input("\nWould you like to (1) Try different weights ('yes'), (2) Try a batch of random weights ('sweep'), (3) See the optimal solution ('show'), or (4) Exit the game ('exit')? Enter your choice: ").lower().strip()
         
         if play_again_input == 'show':
             print("\n" + "="*70)
@@ -324,6 +489,10 @@ if __name__ == "__main__":
             break
         elif play_again_input == 'yes':
             continue
+        elif play_again_input == 'sweep':
+            run_weight_sweep(symbols_for_game, shared_simulated_asset_paths, initial_portfolio_value,
+                             num_time_intervals, sweep_rng)
+            continue
         else:
-            print("Invalid input. Please choose 'yes', 'show', or 'exit'. Continuing with another round.")
+            print("Invalid input. Please choose 'yes', 'sweep', 'show', or 'exit'. Continuing with another round.")
             continue
\ No newline at end of file
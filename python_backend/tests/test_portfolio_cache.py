@@ -0,0 +1,45 @@
+import os
+import sys
+
+import numpy as np
+import pytest
+
+# The API module pulls in the web stack and market-data clients at import time
+for dependency in ("fastapi", "pydantic", "orjson", "httpx", "dotenv", "yfinance"):
+    pytest.importorskip(dependency)
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import api
+
+
+@pytest.fixture(autouse=True)
+def empty_portfolio_cache():
+    api._cached_portfolio_data.clear()
+    yield
+    api._cached_portfolio_data.clear()
+
+
+def _store_initialized(init_request):
+    entry = {'params': api._portfolio_params(init_request), 'mc_paths': np.zeros((2, 3, 4), dtype=np.float32)}
+    api._store_cached_portfolio([api._portfolio_cache_key(init_request.symbols)], entry)
+    return entry
+
+
+def test_default_simulate_payload_finds_default_initialization():
+    # What the frontend sends: only symbols to /initialize-data, symbols + weights + value to /simulate
+    entry = _store_initialized(api.StockSelectionRequest(symbols=["AAPL", "MSFT"]))
+    simulate_request = api.UserWeightsRequest(symbols=["MSFT", "AAPL"], weights={"AAPL": 0.5, "MSFT": 0.5},
+                                              initialPortfolioValue=100000)
+
+    assert api._get_cached_portfolio(api._portfolio_cache_key(simulate_request.symbols)) is entry
+    assert api._conflicting_params(entry['params'], simulate_request) == []
+
+
+def test_explicit_simulate_params_are_checked_against_the_entry():
+    entry = _store_initialized(api.StockSelectionRequest(symbols=["AAPL", "MSFT"], numTimeIntervals=126))
+
+    matching = api.UserWeightsRequest(symbols=["AAPL", "MSFT"], weights={"AAPL": 1.0}, numTimeIntervals=126)
+    conflicting = api.UserWeightsRequest(symbols=["AAPL", "MSFT"], weights={"AAPL": 1.0}, historicalPeriod="1y")
+
+    assert api._conflicting_params(entry['params'], matching) == []
+    assert api._conflicting_params(entry['params'], conflicting) == ["historicalPeriod"]